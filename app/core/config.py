@@ -7,6 +7,7 @@ class Settings(BaseSettings):
 
     # App
     APP_ENV: str = "dev"  # dev|prod|test
+    LOG_LEVEL: str = "INFO"  # DEBUG|INFO|WARNING|ERROR
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     DEFAULT_TENANT_ID: str = "default"
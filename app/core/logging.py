@@ -3,8 +3,25 @@ import sys
 import structlog
 from typing import Any, Mapping
 
+# Nível mínimo efetivo do structlog (NOTSET até configure_logging rodar,
+# igual ao default do structlog, que não filtra nada).
+_min_level = logging.NOTSET
+
+
+def is_enabled_for(level: int) -> bool:
+    """Permite pular a montagem dos kwargs de log quando o nível está filtrado."""
+    return level >= _min_level
+
+
+def _parse_level(name: str) -> int:
+    """Converte LOG_LEVEL ("debug", "WARNING", ...) em nível numérico; inválido vira INFO."""
+    level = logging.getLevelNamesMapping().get(str(name or "").strip().upper())
+    return level if level is not None else logging.INFO
+
+
+def configure_logging(level: str | None = None) -> None:
+    global _min_level
 
-def configure_logging() -> None:
     timestamper = structlog.processors.TimeStamper(fmt="iso")
 
     SENSITIVE_KEYS = {
@@ -71,13 +88,16 @@ def configure_logging() -> None:
         return redacted
 
     import os
+    from app.core.config import settings
+
     is_dev = os.getenv("APP_ENV", "dev").lower() in ("dev", "development", "local")
+    _min_level = _parse_level(settings.LOG_LEVEL if level is None else level)
 
     # Configurar logging padrão primeiro
     logging.basicConfig(
         format="%(message)s",
         stream=sys.stdout,
-        level=logging.INFO,
+        level=_min_level,
     )
 
     structlog.configure(
@@ -88,7 +108,7 @@ def configure_logging() -> None:
             structlog.processors.dict_tracebacks,
             structlog.dev.ConsoleRenderer(colors=True) if is_dev else structlog.processors.JSONRenderer(),
         ],
-        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        wrapper_class=structlog.make_filtering_bound_logger(_min_level),
         logger_factory=structlog.PrintLoggerFactory(file=sys.stdout),
         cache_logger_on_first_use=False,  # Não cachear para ver mudanças
     )
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 from zoneinfo import ZoneInfo
 
 # Simple business hours policy (configurable per-tenant in the future)
@@ -26,3 +26,23 @@ def within_business_hours(
         # Allow from start until 23:59:59
         return local_t >= start or local_t < time(0, 0)
     return local_t >= start or local_t < end
+
+
+def next_business_open(
+    now: datetime | None = None,
+    tz: ZoneInfo = DEFAULT_TZ,
+    start: time = DEFAULT_START,
+    end: time = DEFAULT_END,
+) -> datetime:
+    """
+    Returns now if within business hours; otherwise the next opening (start) in tz.
+    Used as Celery ETA so off-hours messages wait in the broker instead of being dropped.
+    """
+    now = now or datetime.now(tz)
+    if within_business_hours(now, tz, start, end):
+        return now
+    local = now.astimezone(tz)
+    opening = local.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+    if opening <= local:
+        opening += timedelta(days=1)
+    return opening
@@ -1,24 +1,67 @@
 from __future__ import annotations
 
 import re
-from typing import Tuple
-from sqlalchemy import select, delete
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import select, delete, insert
 from sqlalchemy.orm import Session
 from app.domain.realestate import models as re_models
 
+_PREFETCH_CHUNK = 500
 
-def upsert_property(db: Session, tenant_id: int, dto) -> Tuple[str, int]:
+
+def _truncate(value: str | None, max_len: int) -> str | None:
+    if value is None:
+        return None
+    s = str(value)
+    return s[:max_len]
+
+
+def _external_id(dto) -> str | None:
+    # Garantir external_id para chave única com tenant
+    return _truncate((dto.external_id or dto.url), 120)
+
+
+def load_existing_properties(db: Session, tenant_id: int, dtos: Iterable) -> Dict[str, re_models.Property]:
+    """Carrega de uma vez (SELECT ... IN em lotes) os imóveis já existentes para os DTOs.
+
+    O dicionário (external_id -> Property) é repassado a `upsert_property(..., existing=...)`,
+    que deixa de fazer um SELECT por imóvel.
+    """
+    keys = sorted({k for k in (_external_id(d) for d in dtos) if k})
+    found: Dict[str, re_models.Property] = {}
+    for start in range(0, len(keys), _PREFETCH_CHUNK):
+        stmt = select(re_models.Property).where(
+            re_models.Property.tenant_id == tenant_id,
+            re_models.Property.external_id.in_(keys[start : start + _PREFETCH_CHUNK]),
+        )
+        for prop in db.execute(stmt).scalars():
+            found[prop.external_id] = prop
+    return found
+
+
+def insert_images(db: Session, pending_images: Dict[int, List[dict]]) -> int:
+    """Grava numa única executemany as imagens acumuladas por `upsert_property(..., pending_images=...)`."""
+    rows = [row for rows in pending_images.values() for row in rows]
+    if rows:
+        db.execute(insert(re_models.PropertyImage), rows)
+    pending_images.clear()
+    return len(rows)
+
+
+def upsert_property(
+    db: Session,
+    tenant_id: int,
+    dto,
+    existing: Dict[str, re_models.Property] | None = None,
+    pending_images: Dict[int, List[dict]] | None = None,
+) -> Tuple[str, int]:
     """
     Faz UPSERT de um imóvel e substitui as imagens.
     Retorna (status, images_created) onde status in {"created", "updated"}.
+    Com `existing` (ver `load_existing_properties`) a busca do imóvel é feita no dicionário.
+    Com `pending_images` as novas imagens ficam acumuladas (por imóvel) para `insert_images`.
     """
 
-    def _truncate(value: str | None, max_len: int) -> str | None:
-        if value is None:
-            return None
-        s = str(value)
-        return s[:max_len]
-
     def _normalize_state(value: str | None) -> str:
         raw = (value or "").strip().upper()
         if len(raw) == 2:
@@ -28,19 +71,21 @@ def upsert_property(db: Session, tenant_id: int, dto) -> Tuple[str, int]:
             return m.group(1)
         return raw[:2]
 
-    # Garantir external_id para chave única com tenant
-    external_id = _truncate((dto.external_id or dto.url), 120)
+    external_id = _external_id(dto)
     title = _truncate((dto.title or "Sem título"), 180) or "Sem título"
     city = _truncate((dto.city or ""), 120) or ""
     state = _normalize_state(dto.state)
     neighborhood = _truncate((dto.neighborhood or None), 120)
 
     # Buscar existente
-    stmt = select(re_models.Property).where(
-        re_models.Property.tenant_id == tenant_id,
-        re_models.Property.external_id == external_id,
-    )
-    prop = db.execute(stmt).scalar_one_or_none()
+    if existing is not None:
+        prop = existing.get(external_id)
+    else:
+        stmt = select(re_models.Property).where(
+            re_models.Property.tenant_id == tenant_id,
+            re_models.Property.external_id == external_id,
+        )
+        prop = db.execute(stmt).scalar_one_or_none()
 
     # Mapear enums
     ptype_map = {
@@ -85,6 +130,8 @@ def upsert_property(db: Session, tenant_id: int, dto) -> Tuple[str, int]:
         )
         db.add(prop)
         db.flush()
+        if existing is not None and external_id:
+            existing[external_id] = prop
         status = "created"
     else:
         if title:
@@ -113,22 +160,20 @@ def upsert_property(db: Session, tenant_id: int, dto) -> Tuple[str, int]:
     imgs = dto.images or []
     if imgs:
         db.execute(delete(re_models.PropertyImage).where(re_models.PropertyImage.property_id == prop.id))
-        order = 0
+        rows = []
         for idx, url in enumerate(imgs):
             if not url:
                 continue
             if len(url) > 500:
                 continue
-            db.add(
-                re_models.PropertyImage(
-                    property_id=prop.id,
-                    url=url,
-                    is_cover=(idx == 0),
-                    sort_order=order,
-                )
-            )
-            order += 1
-            images_created += 1
+            rows.append({"property_id": prop.id, "url": url, "is_cover": (idx == 0), "sort_order": len(rows)})
+        if pending_images is not None:
+            # Substitui o que já estava pendente para o mesmo imóvel
+            pending_images[prop.id] = rows
+        elif rows:
+            # Um INSERT executemany para todas as imagens do imóvel
+            db.execute(insert(re_models.PropertyImage), rows)
+        images_created = len(rows)
 
     # Guardar source_url dentro de address_json (sem sobrescrever chaves existentes)
     try:
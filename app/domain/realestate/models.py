@@ -11,6 +11,7 @@ from sqlalchemy import (
     JSON,
     Index,
     Float,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.repositories.db import Base
@@ -49,7 +50,7 @@ class ChatbotFlow(Base):
 
     flow_definition: Mapped[dict] = mapped_column(JSON)
 
-    is_published: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    is_published: Mapped[bool] = mapped_column(Boolean, default=False)
     published_version: Mapped[int] = mapped_column(Integer, default=0)
     published_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     published_by: Mapped[str | None] = mapped_column(String(180), nullable=True)
@@ -62,7 +63,23 @@ class ChatbotFlow(Base):
 
     __table_args__ = (
         Index("uix_re_chatbot_flow_tenant_domain_name", "tenant_id", "domain", "name", unique=True),
-        Index("idx_re_chatbot_flow_tenant_domain_published", "tenant_id", "domain", "is_published"),
+        # Só os flows publicados entram no índice (rascunhos são a maioria das linhas)
+        Index(
+            "idx_re_chatbot_flow_published",
+            "tenant_id",
+            "domain",
+            postgresql_where=text("is_published = true"),
+            sqlite_where=text("is_published = 1"),
+        ),
+        # Listagem do admin: flows não arquivados do tenant já na ordem do ORDER BY
+        Index(
+            "idx_re_chatbot_flows_active",
+            "tenant_id",
+            text("updated_at DESC"),
+            text("id DESC"),
+            postgresql_where=text("is_archived = false"),
+            sqlite_where=text("is_archived = 0"),
+        ),
     )
 
 
@@ -165,13 +182,18 @@ class PropertyExternalRef(Base):
     __tablename__ = "re_property_external_refs"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    tenant_id: Mapped[int] = mapped_column(Integer, index=True)
-    provider: Mapped[str] = mapped_column(String(32), index=True)  # chavesnamao, facebook, instagram, etc.
+    tenant_id: Mapped[int] = mapped_column(Integer)
+    provider: Mapped[str] = mapped_column(String(32))  # chavesnamao, facebook, instagram, etc.
     external_id: Mapped[str] = mapped_column(String(160))
     url: Mapped[str | None] = mapped_column(String(500), nullable=True)
-    property_id: Mapped[int] = mapped_column(ForeignKey("re_properties.id"), index=True)
+    property_id: Mapped[int] = mapped_column(ForeignKey("re_properties.id"))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("uix_re_prop_extref", "tenant_id", "provider", "external_id", unique=True),
+        Index("idx_re_prop_extref_tenant_property", "tenant_id", "property_id"),
+    )
+
 
 class InvalidLeadStatusTransition(Exception):
     pass
@@ -189,7 +211,7 @@ class Lead(Base):
 
     preferences: Mapped[dict | None] = mapped_column(JSON, default=None)
     consent_lgpd: Mapped[bool] = mapped_column(Boolean, default=False)
-    campaign_source: Mapped[str | None] = mapped_column(String(32), nullable=True, index=True)
+    campaign_source: Mapped[str | None] = mapped_column(String(32), nullable=True)
     campaign_medium: Mapped[str | None] = mapped_column(String(32), nullable=True)
     campaign_name: Mapped[str | None] = mapped_column(String(120), nullable=True)
     campaign_content: Mapped[str | None] = mapped_column(String(120), nullable=True)
@@ -204,17 +226,27 @@ class Lead(Base):
     property_interest_id: Mapped[int | None] = mapped_column(ForeignKey("re_properties.id"), nullable=True, index=True)
     contact_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
 
-    finalidade: Mapped[str | None] = mapped_column(String(16), nullable=True, index=True)
-    tipo: Mapped[str | None] = mapped_column(String(32), nullable=True, index=True)
-    cidade: Mapped[str | None] = mapped_column(String(120), nullable=True, index=True)
-    estado: Mapped[str | None] = mapped_column(String(2), nullable=True, index=True)
-    bairro: Mapped[str | None] = mapped_column(String(120), nullable=True, index=True)
-    dormitorios: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
-    preco_min: Mapped[float | None] = mapped_column(Float, nullable=True, index=True)
-    preco_max: Mapped[float | None] = mapped_column(Float, nullable=True, index=True)
+    # Filtros de lead: índices compostos começando por tenant_id (ver __table_args__)
+    finalidade: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    tipo: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    cidade: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    estado: Mapped[str | None] = mapped_column(String(2), nullable=True)
+    bairro: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    dormitorios: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    preco_min: Mapped[float | None] = mapped_column(Float, nullable=True)
+    preco_max: Mapped[float | None] = mapped_column(Float, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("idx_re_leads_tenant_filters", "tenant_id", "finalidade", "tipo", "dormitorios"),
+        # Filtro só por tipo (sem finalidade) não aproveita o índice acima além do tenant
+        Index("idx_re_leads_tenant_type_purpose", "tenant_id", "tipo", "finalidade"),
+        Index("idx_re_leads_tenant_price", "tenant_id", "preco_min", "preco_max"),
+        # Cobre o relatório de origem (tenant + período, agrupado por campanha) sem ir à tabela
+        Index("idx_re_leads_tenant_campaign_source", "tenant_id", "campaign_source", "status", "created_at"),
+    )
+
     @staticmethod
     def create_for_contact(tenant_id: int, contact_id: int, phone: str) -> Lead:
         return Lead(
@@ -330,3 +362,6 @@ class VisitSchedule(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    lead: Mapped[Lead] = relationship()
+    property: Mapped[Property] = relationship()
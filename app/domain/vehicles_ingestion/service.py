@@ -6,6 +6,7 @@ from typing import Any
 
 import httpx
 import structlog
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.domain.catalog.models import (
@@ -32,12 +33,23 @@ class RunResult:
 
 log = structlog.get_logger()
 
+# Erros por URL acumulados em memória e gravados em lote (um INSERT a cada N).
+_ERROR_FLUSH_THRESHOLD = 100
+
 
 class VehicleIngestionService:
     def __init__(self, *, db: Session, tenant_id: int):
         self.db = db
         self.tenant_id = int(tenant_id)
         self.log = log.bind(tenant_id=self.tenant_id)
+        self._error_buffer: list[dict[str, Any]] = []
+
+    def flush_errors(self) -> None:
+        """Grava os erros pendentes em um único INSERT (executemany); o commit fica com o chamador."""
+        if not self._error_buffer:
+            return
+        self.db.execute(insert(CatalogIngestionError), self._error_buffer)
+        self._error_buffer = []
 
     def _build_description(self, listing: VehicleListing) -> str | None:
         base = (listing.description or "").strip() or None
@@ -282,7 +294,9 @@ class VehicleIngestionService:
                         raise RuntimeError(f"http_{r.status_code}")
                     listing = parse_vehicle_listing(html=r.text or "", page_url=u)
 
-                    is_created, _ = self._upsert_listing(item_type=item_type, source=source, listing=listing)
+                    # SAVEPOINT por URL: falha desfaz só este anúncio e a sessão segue utilizável.
+                    with self.db.begin_nested():
+                        is_created, _ = self._upsert_listing(item_type=item_type, source=source, listing=listing)
                     processed += 1
                     if is_created:
                         created += 1
@@ -297,15 +311,14 @@ class VehicleIngestionService:
                 except Exception as e:
                     self.log.error("ingestion.processing.error", run_id=run.id, url=u, error=str(e))
                     errors += 1
-                    err = CatalogIngestionError(
-                        tenant_id=self.tenant_id,
-                        run_id=int(run.id),
-                        url=str(u),
-                        error=str(e)[:400],
+                    self._error_buffer.append(
+                        {"tenant_id": self.tenant_id, "run_id": int(run.id), "url": str(u), "error": str(e)[:400]}
                     )
-                    self.db.add(err)
-                    self.db.commit()
+                    if len(self._error_buffer) >= _ERROR_FLUSH_THRESHOLD:
+                        self.flush_errors()
+                        self.db.commit()
 
+        self.flush_errors()
         run.status = "finished"
         run.finished_at = datetime.utcnow()
         run.processed_count = int(processed)
@@ -17,16 +17,27 @@ from app.repositories.models import (
 from app.core.config import settings
 
 
+# Credenciais por tenant (token, phone_number_id) mudam raramente: evita uma
+# sessão de banco por envio.
+_CREDENTIALS_TTL_SECONDS = 60.0
+
+
 class MetaCloudProvider:
     def __init__(self, api_base: str, token: str, phone_number_id: str) -> None:
         self.api_base = api_base.rstrip("/")
         self.token = token
         self.phone_number_id = phone_number_id
-        self._client = httpx.Client(timeout=15.0)
+        # Cliente único do provider (singleton do processo): conexões keep-alive
+        # reaproveitadas entre envios, sem novo handshake TCP/TLS por mensagem.
+        self._client = httpx.Client(
+            timeout=15.0,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0),
+        )
+        self._credentials_cache: Dict[int, tuple[str, str, float]] = {}
 
-    def _headers(self) -> Dict[str, str]:
+    def _headers(self, token: Optional[str] = None) -> Dict[str, str]:
         return {
-            "Authorization": f"Bearer {self.token}",
+            "Authorization": f"Bearer {token or self.token}",
             "Content-Type": "application/json",
         }
 
@@ -47,6 +58,11 @@ class MetaCloudProvider:
         except Exception:
             return token, phone_number_id
 
+        now = time.monotonic()
+        cached = self._credentials_cache.get(tid)
+        if cached is not None and now - cached[2] < _CREDENTIALS_TTL_SECONDS:
+            return cached[0], cached[1]
+
         try:
             with db_session() as db:
                 acct = (
@@ -65,14 +81,17 @@ class MetaCloudProvider:
                         phone_number_id = acct.phone_number_id
         except Exception:
             # Fail closed on credential override issues: keep default settings
-            pass
+            return token, phone_number_id
+        self._credentials_cache[tid] = (token, phone_number_id, now)
         return token, phone_number_id
 
-    def _post_with_retry(self, url: str, json: Dict[str, Any], max_attempts: int = 3) -> httpx.Response:
+    def _post_with_retry(
+        self, url: str, json: Dict[str, Any], max_attempts: int = 3, token: Optional[str] = None
+    ) -> httpx.Response:
         last_exc: Exception | None = None
         for attempt in range(1, max_attempts + 1):
             try:
-                r = self._client.post(url, headers=self._headers(), json=json)
+                r = self._client.post(url, headers=self._headers(token), json=json)
                 r.raise_for_status()
                 return r
             except Exception as exc:
@@ -147,12 +166,7 @@ class MetaCloudProvider:
         }
         try:
             url = f"{self.api_base}/{phone_number_id}/messages"
-            prev = self.token
-            try:
-                self.token = token
-                r = self._post_with_retry(url, payload)
-            finally:
-                self.token = prev
+            r = self._post_with_retry(url, payload, token=token)
             data = r.json()
             provider_id = None
             try:
@@ -243,13 +257,7 @@ class MetaCloudProvider:
             payload["template"]["components"] = components
         try:
             url = f"{self.api_base}/{phone_number_id}/messages"
-            # Temporarily override token for this request
-            prev = self.token
-            try:
-                self.token = token
-                r = self._post_with_retry(url, payload)
-            finally:
-                self.token = prev
+            r = self._post_with_retry(url, payload, token=token)
             data = r.json()
             provider_id = None
             try:
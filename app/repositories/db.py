@@ -1,5 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import DateTime, create_engine
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.sql.expression import FunctionElement
 from sqlalchemy.pool import StaticPool
 from app.core.config import settings
 
@@ -10,8 +14,38 @@ class Base(DeclarativeBase):
     pass
 
 
+class utcnow(FunctionElement):
+    """Agora em UTC (naive) avaliado pelo banco, na mesma convenção de datetime.utcnow()."""
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow, "postgresql")
+def _pg_utcnow(element, compiler, **kw):  # type: ignore[no-untyped-def]
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+@compiles(utcnow)
+def _default_utcnow(element, compiler, **kw):  # type: ignore[no-untyped-def]
+    # SQLite: CURRENT_TIMESTAMP já é UTC no formato "YYYY-MM-DD HH:MM:SS".
+    return "CURRENT_TIMESTAMP"
+
+
+def dialect_insert(db):  # type: ignore[no-untyped-def]
+    """insert() do dialeto da sessão com suporte a ON CONFLICT (PostgreSQL/SQLite); None nos demais."""
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        return pg_insert
+    if name == "sqlite":
+        return sqlite_insert
+    return None
+
+
 # Ajuste para SQLite em desenvolvimento: evitar erro de threads do SQLite
-kwargs = {"pool_pre_ping": True}
+# query_cache_size: cache de SQL compilado maior que o padrão (500); as tasks
+# por mensagem repetem as mesmas poucas formas de statement.
+kwargs = {"pool_pre_ping": True, "query_cache_size": 1200}
 if settings.DATABASE_URL.startswith("sqlite"):
     kwargs["connect_args"] = {"check_same_thread": False}
     # Em memória, garantir que a mesma conexão seja usada em todas as sessoes
@@ -23,7 +57,23 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 @contextlib.contextmanager
-def db_session():
+def db_session(bind_connection: bool = False):
+    """Sessão de curta duração.
+
+    bind_connection=True prende a sessão a uma única conexão durante todo o bloco
+    (jobs longos com muitos commits não devolvem/pegam conexão do pool a cada commit).
+    """
+    if bind_connection:
+        with engine.connect() as conn:
+            db = SessionLocal(bind=conn)
+            try:
+                yield db
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+        return
     db = SessionLocal()
     try:
         yield db
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import String, Integer, DateTime, Enum as SAEnum, ForeignKey, Boolean, JSON, Index, Float
+from sqlalchemy import String, Integer, DateTime, Enum as SAEnum, ForeignKey, Boolean, JSON, Index, Float, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 
@@ -52,6 +52,7 @@ class OnboardingRun(Base):
     status: Mapped[str] = mapped_column(String(32), default="in_progress", index=True)
     tenant_id: Mapped[int | None] = mapped_column(ForeignKey("tenants.id"), nullable=True, index=True)
     request_json: Mapped[dict] = mapped_column(JSON, default=dict)
+    request_hash: Mapped[str | None] = mapped_column(String(32), nullable=True)
     response_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     error_code: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -110,6 +111,17 @@ class Conversation(Base):
 
     contact: Mapped[Contact] = relationship(back_populates="conversations")
 
+    __table_args__ = (
+        # Busca da conversa aberta de um contato (envio outbound / webhook).
+        Index(
+            "ix_conversations_open",
+            "tenant_id",
+            "contact_id",
+            postgresql_where=text("status != 'closed'"),
+            sqlite_where=text("status != 'closed'"),
+        ),
+    )
+
 
 class MessageDirection(str, Enum):
     inbound = "inbound"
@@ -200,4 +212,11 @@ class UserInvite(Base):
 
     __table_args__ = (
         Index("idx_invite_tenant_email", "tenant_id", "email"),
+        Index(
+            "ix_user_invites_active",
+            "tenant_id",
+            "email",
+            postgresql_where=text("used_at IS NULL"),
+            sqlite_where=text("used_at IS NULL"),
+        ),
     )
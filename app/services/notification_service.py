@@ -1,17 +1,31 @@
 """
 Serviço para envio de notificações (email, WhatsApp, etc).
 """
+import logging
 from typing import Optional
+
 import structlog
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, raiseload
 
+from app.core.logging import is_enabled_for
 from app.domain.realestate import models as re_models
 from app.messaging.provider import get_provider
 from app.repositories.models import Tenant
 
 log = structlog.get_logger()
 
+_NON_DIGIT_BYTES = bytes(b for b in range(256) if not 0x30 <= b <= 0x39)
+
+_VISIT_REQUESTED_TMPL = (
+    "📅 *Solicitação de visita (pendente de confirmação)*\n"
+    "• Lead: %s\n"
+    "• Contato: %s\n"
+    "• Imóvel: #%s\n"
+    "• Sugestão: %s"
+)
+
 
 class NotificationService:
     """Serviço para enviar notificações sobre agendamentos."""
@@ -25,8 +39,11 @@ class NotificationService:
             s = s.split("@", 1)[0]
         if s.startswith("+"):
             s = s[1:]
-        s = "".join(ch for ch in s if ch.isdigit())
-        return s
+        try:
+            # Caso comum (ASCII): filtro de dígitos em C via bytes.translate.
+            return s.encode("ascii").translate(None, _NON_DIGIT_BYTES).decode("ascii")
+        except UnicodeEncodeError:
+            return "".join(ch for ch in s if ch.isdigit())
 
     @staticmethod
     def _get_recipients(settings_json: dict) -> list[str]:
@@ -34,7 +51,10 @@ class NotificationService:
         if not raw:
             return []
         if isinstance(raw, list):
-            return [str(x) for x in raw if str(x).strip()]
+            # Caso comum: lista de str, sem conversões nem strip temporário.
+            if all(type(x) is str for x in raw):
+                return [x for x in raw if x and not x.isspace()]
+            return [s for s in map(str, raw) if s.strip()]
         return []
 
     @staticmethod
@@ -44,47 +64,57 @@ class NotificationService:
 
     @staticmethod
     def _format_visit_requested_message(visit: re_models.VisitSchedule, lead: re_models.Lead | None, prop: re_models.Property | None) -> str:
-        lead_name = (getattr(lead, "name", None) or "-")
-        lead_phone = (getattr(lead, "phone", None) or getattr(visit, "contact_phone", None) or "-")
+        lead_name = (lead.name if lead is not None else None) or "-"
+        lead_phone = (lead.phone if lead is not None else None) or visit.contact_phone or "-"
         ref = ""
         if prop is not None:
-            ref = getattr(prop, "ref_code", None) or getattr(prop, "external_id", None) or str(getattr(prop, "id", ""))
-        dt = getattr(visit, "scheduled_datetime", None)
+            ref = prop.ref_code or prop.external_id or (str(prop.id) if prop.id else "")
+        dt = visit.scheduled_datetime
         dt_txt = dt.strftime("%d/%m/%Y %H:%M") if dt else "-"
-        return (
-            "📅 *Solicitação de visita (pendente de confirmação)*\n"
-            f"• Lead: {lead_name}\n"
-            f"• Contato: {lead_phone}\n"
-            f"• Imóvel: #{ref}\n"
-            f"• Sugestão: {dt_txt}"
-        )
+        return _VISIT_REQUESTED_TMPL % (lead_name, lead_phone, ref, dt_txt)
 
     @staticmethod
     def notify_visit_requested(db: Session, visit_id: int) -> dict:
-        visit = db.get(re_models.VisitSchedule, int(visit_id))
+        # Visita + lead + imóvel num único SELECT (many-to-one via JOIN).
+        visit = db.scalars(
+            select(re_models.VisitSchedule)
+            .where(re_models.VisitSchedule.id == int(visit_id))
+            .options(
+                joinedload(re_models.VisitSchedule.lead),
+                joinedload(re_models.VisitSchedule.property),
+                raiseload("*"),
+            )
+        ).first()
         if not visit:
             return {"notified": 0, "errors": [{"error": "visit_not_found"}]}
 
-        tenant = db.get(Tenant, int(getattr(visit, "tenant_id", 0)))
+        tenant = db.get(Tenant, int(visit.tenant_id or 0))
         if not tenant:
             return {"notified": 0, "errors": [{"error": "tenant_not_found"}]}
 
-        settings_json = dict(getattr(tenant, "settings_json", {}) or {})
+        settings_json = dict(tenant.settings_json or {})
         recipients = NotificationService._get_recipients(settings_json)
         template_name = NotificationService._get_template_name(settings_json)
 
-        lead = db.get(re_models.Lead, int(getattr(visit, "lead_id"))) if getattr(visit, "lead_id", None) else None
-        prop = db.get(re_models.Property, int(getattr(visit, "property_id"))) if getattr(visit, "property_id", None) else None
+        lead = visit.lead
+        prop = visit.property
         text = NotificationService._format_visit_requested_message(visit, lead, prop)
 
         provider = get_provider()
         notified = 0
         errors: list[dict] = []
 
+        # O mesmo número pode estar cadastrado em formatos diferentes
+        # ("+55...", "55...@c.us", "55..."): envia uma única vez por destino.
+        seen: set[str] = set()
+        targets: list[tuple[str, str]] = []
         for raw in recipients:
             to = NotificationService._normalize_wa_id(raw)
-            if not to:
-                continue
+            if to and to not in seen:
+                seen.add(to)
+                targets.append((raw, to))
+
+        for raw, to in targets:
             try:
                 if template_name:
                     provider.send_template(to, template_name, tenant_id=str(tenant.id))
@@ -96,7 +126,7 @@ class NotificationService:
 
         log.info(
             "visit_requested_notification",
-            visit_id=int(getattr(visit, "id", 0) or 0),
+            visit_id=int(visit.id or 0),
             recipients=len(recipients),
             notified=notified,
             errors=errors[:3],
@@ -128,15 +158,16 @@ class NotificationService:
         """
         # TODO: Implementar integração com sistema de notificações
         # Por enquanto, apenas log
-        log.info(
-            "visit_scheduled_notification",
-            visit_id=visit_id,
-            property_id=property_id,
-            lead_name=lead_name,
-            phone=phone,
-            visit_datetime=visit_datetime,
-            property_address=property_address
-        )
+        if is_enabled_for(logging.INFO):
+            log.info(
+                "visit_scheduled_notification",
+                visit_id=visit_id,
+                property_id=property_id,
+                lead_name=lead_name,
+                phone=phone,
+                visit_datetime=visit_datetime,
+                property_address=property_address
+            )
         
         # Simular envio bem-sucedido
         return True
@@ -144,23 +175,25 @@ class NotificationService:
     @staticmethod
     def notify_visit_confirmed(visit_id: int, lead_name: str, phone: str) -> bool:
         """Notifica sobre confirmação de visita."""
-        log.info(
-            "visit_confirmed_notification",
-            visit_id=visit_id,
-            lead_name=lead_name,
-            phone=phone
-        )
+        if is_enabled_for(logging.INFO):
+            log.info(
+                "visit_confirmed_notification",
+                visit_id=visit_id,
+                lead_name=lead_name,
+                phone=phone
+            )
         return True
     
     @staticmethod
     def notify_visit_cancelled(visit_id: int, lead_name: str, reason: Optional[str] = None) -> bool:
         """Notifica sobre cancelamento de visita."""
-        log.info(
-            "visit_cancelled_notification",
-            visit_id=visit_id,
-            lead_name=lead_name,
-            reason=reason
-        )
+        if is_enabled_for(logging.INFO):
+            log.info(
+                "visit_cancelled_notification",
+                visit_id=visit_id,
+                lead_name=lead_name,
+                reason=reason
+            )
         return True
     
     @staticmethod
@@ -176,7 +209,8 @@ class NotificationService:
         Returns:
             True se enviado com sucesso
         """
-        log.info("email_sent", to=to, subject=subject)
+        if is_enabled_for(logging.INFO):
+            log.info("email_sent", to=to, subject=subject)
         return True
     
     @staticmethod
@@ -191,5 +225,7 @@ class NotificationService:
         Returns:
             True se enviado com sucesso
         """
-        log.info("whatsapp_sent", phone=phone, message_preview=message[:50])
+        # O slice do preview só é feito quando o log vai ser emitido.
+        if is_enabled_for(logging.INFO):
+            log.info("whatsapp_sent", phone=phone, message_preview=message[:50])
         return True
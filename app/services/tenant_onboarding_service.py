@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from dataclasses import dataclass
-from datetime import datetime
 
 from fastapi import HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import exists as sa_exists, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.api.routes.admin import _issue_invite
 from app.api.schemas.chatbot_templates import ChatbotFlowTemplateApplyIn
+from app.repositories.db import dialect_insert, utcnow
 from app.repositories.models import Tenant, WhatsAppAccount, UserRole, OnboardingRun, UserInvite
 from app.services.chatbot_template_service import apply_chatbot_flow_template
 from app.core.config import settings
@@ -14,6 +20,27 @@ from app.domain.catalog.models import CatalogIngestionRun
 from app.services.vehicle_ingestion_jobs import run_vehicle_ingestion_job
 
 
+def _request_hash(payload: dict) -> str:
+    """Hash canônico do payload: idempotência compara uma string, sem trafegar o JSON."""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _latest_active_invite_token(db: Session, tenant_id: int, email: str) -> str | None:
+    """Token do convite ativo mais recente (só a coluna token, sem hidratar UserInvite)."""
+    return db.scalar(
+        select(UserInvite.token)
+        .where(
+            UserInvite.tenant_id == int(tenant_id),
+            UserInvite.email == email,
+            UserInvite.used_at.is_(None),
+            UserInvite.expires_at > utcnow(),
+        )
+        .order_by(UserInvite.id.desc())
+        .limit(1)
+    )
+
+
 @dataclass(frozen=True)
 class OnboardTenantByUrlResult:
     tenant_id: int
@@ -46,9 +73,13 @@ class TenantOnboardingService:
 
         domain = (chatbot_domain or "").strip() or "real_estate"
 
-        exists = self.db.query(Tenant).filter(Tenant.name == tenant_name).first()
-        if exists and not allow_existing:
-            raise HTTPException(status_code=400, detail="tenant_name_already_exists")
+        if allow_existing:
+            exists = self.db.query(Tenant).filter(Tenant.name == tenant_name).first()
+        else:
+            # Só precisa saber se existe: evita hidratar o Tenant inteiro.
+            if self.db.scalar(select(sa_exists().where(Tenant.name == tenant_name))):
+                raise HTTPException(status_code=400, detail="tenant_name_already_exists")
+            exists = None
 
         if exists:
             t = exists
@@ -64,14 +95,11 @@ class TenantOnboardingService:
                 enabled_domains = [str(x).strip() for x in raw_enabled if str(x).strip()]
             else:
                 enabled_domains = []
-            if not enabled_domains:
-                enabled_domains = [domain]
-                changed = True
             if domain not in enabled_domains:
-                enabled_domains = [domain, *[d for d in enabled_domains if d != domain]]
+                settings_json["enabled_domains"] = [domain, *enabled_domains]
                 changed = True
-            settings_json["enabled_domains"] = enabled_domains
 
+            # Tenant idempotente: nada mudou, não marca o JSON como dirty (sem UPDATE).
             if changed:
                 t.settings_json = settings_json
                 self.db.add(t)
@@ -120,10 +148,6 @@ class TenantOnboardingService:
         if not pnid:
             raise HTTPException(status_code=400, detail="phone_number_id_required")
 
-        existing_wa = self.db.query(WhatsAppAccount).filter(WhatsAppAccount.phone_number_id == pnid).first()
-        if existing_wa:
-            raise HTTPException(status_code=400, detail="phone_number_id_already_exists")
-
         wa = WhatsAppAccount(
             tenant_id=int(tenant_id),
             phone_number_id=pnid,
@@ -131,8 +155,14 @@ class TenantOnboardingService:
             token=((token or "").strip() or None),
             is_active=True,
         )
-        self.db.add(wa)
-        self.db.flush()
+        # A unique constraint de phone_number_id é a guarda: sem SELECT prévio.
+        # O savepoint preserva o restante da transação do onboarding.
+        try:
+            with self.db.begin_nested():
+                self.db.add(wa)
+                self.db.flush()
+        except IntegrityError:
+            raise HTTPException(status_code=400, detail="phone_number_id_already_exists")
         return int(wa.id)
 
     def invite_admin(
@@ -142,8 +172,6 @@ class TenantOnboardingService:
         invite_admin_email: str,
         invite_expires_hours: int | None,
     ) -> tuple[str, str]:
-        from app.api.routes.admin import _issue_invite
-
         email = (invite_admin_email or "").strip().lower()
         if not email:
             raise HTTPException(status_code=400, detail="email_required")
@@ -167,6 +195,7 @@ class TenantOnboardingService:
         timeout_seconds: float,
         max_listing_pages: int,
         background_tasks: BackgroundTasks | None = None,
+        commit: bool = True,
     ) -> dict:
         base = (base_url or "").strip()
         if not base:
@@ -174,14 +203,19 @@ class TenantOnboardingService:
 
         run = CatalogIngestionRun(tenant_id=int(tenant_id), source_base_url=base, status="queued")
         self.db.add(run)
-        self.db.commit()
-        self.db.refresh(run)
+        # O flush já atribui o id; sem refresh (o status é o que acabamos de gravar).
+        self.db.flush()
+        run_id = int(run.id)
+        run_status = str(run.status)
+        if commit:
+            self.db.commit()
 
+        # Background tasks só rodam depois da resposta, quando o chamador já commitou.
         if background_tasks is not None and (settings.APP_ENV or "").lower() != "test":
             background_tasks.add_task(
                 run_vehicle_ingestion_job,
                 tenant_id=int(tenant_id),
-                run_id=int(run.id),
+                run_id=run_id,
                 base_url=base,
                 max_listings=int(max_listings),
                 timeout_seconds=float(timeout_seconds),
@@ -189,10 +223,78 @@ class TenantOnboardingService:
             )
 
         return {
-            "run_id": int(run.id),
-            "status": str(run.status),
+            "run_id": run_id,
+            "status": run_status,
         }
 
+    def _build_replay_result(self, run: OnboardingRun, domain: str) -> OnboardTenantByUrlResult:
+        js = run.response_json or {}
+        replay_invite_token: str | None = None
+        replay_invite_email: str | None = None
+        tenant_id = int(js.get("tenant_id") or 0)
+        if tenant_id and js.get("invite_email"):
+            replay_invite_email = str(js.get("invite_email"))
+            try:
+                replay_invite_token = _latest_active_invite_token(self.db, tenant_id, replay_invite_email)
+            except Exception:
+                replay_invite_token = None
+        return OnboardTenantByUrlResult(
+            tenant_id=tenant_id,
+            tenant_name=str(js.get("tenant_name") or ""),
+            chatbot_domain=str(js.get("chatbot_domain") or domain),
+            flow_id=int(js.get("flow_id") or 0),
+            published=bool(js.get("published")),
+            published_version=(int(js.get("published_version")) if js.get("published_version") is not None else None),
+            ingestion=(js.get("ingestion") if isinstance(js.get("ingestion"), dict) else None),
+            whatsapp_account_id=(int(js.get("whatsapp_account_id")) if js.get("whatsapp_account_id") is not None else None),
+            invite_token=(str(replay_invite_token) if replay_invite_token else None),
+            invite_email=replay_invite_email,
+        )
+
+    def _update_onboarding_run(self, run_id: int, **values) -> None:
+        try:
+            self.db.execute(update(OnboardingRun).where(OnboardingRun.id == run_id).values(**values))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+
+    def _claim_onboarding_run(self, *, key: str, req_payload: dict, req_hash: str) -> OnboardingRun | None:
+        """Cria o OnboardingRun da chave em um único INSERT ... ON CONFLICT DO NOTHING.
+
+        Retorna None quando a chave já existe (o chamador busca o run existente).
+        """
+        insert_fn = dialect_insert(self.db)
+        if insert_fn is None:
+            # Fallback genérico: depende da unique constraint de idempotency_key.
+            run = OnboardingRun(
+                idempotency_key=key,
+                status="in_progress",
+                request_json=req_payload,
+                request_hash=req_hash,
+            )
+            try:
+                self.db.add(run)
+                self.db.commit()
+            except IntegrityError:
+                self.db.rollback()
+                return None
+            return run
+
+        stmt = (
+            insert_fn(OnboardingRun)
+            .values(
+                idempotency_key=key,
+                status="in_progress",
+                request_json=req_payload,
+                request_hash=req_hash,
+            )
+            .on_conflict_do_nothing(index_elements=["idempotency_key"])
+            .returning(OnboardingRun)
+        )
+        run = self.db.scalars(stmt).first()
+        self.db.commit()
+        return run
+
     async def onboard_by_url(
         self,
         *,
@@ -217,6 +319,61 @@ class TenantOnboardingService:
         invite_admin_email: str | None,
         invite_expires_hours: int | None,
         background_tasks: BackgroundTasks | None = None,
+    ) -> OnboardTenantByUrlResult:
+        """Executa o onboarding (ver _onboard_sync) numa thread do pool.
+
+        Todo o trabalho é Session síncrona; rodar direto no event loop travaria as
+        demais requisições durante todos os round trips do onboarding.
+        """
+        return await run_in_threadpool(
+            self._onboard_sync,
+            idempotency_key=idempotency_key,
+            name=name,
+            timezone=timezone,
+            chatbot_domain=chatbot_domain,
+            allow_existing=allow_existing,
+            template=template,
+            flow_name=flow_name,
+            overwrite_flow=overwrite_flow,
+            publish_flow=publish_flow,
+            base_url=base_url,
+            run_ingestion=run_ingestion,
+            max_listings=max_listings,
+            timeout_seconds=timeout_seconds,
+            max_listing_pages=max_listing_pages,
+            create_whatsapp_account=create_whatsapp_account,
+            phone_number_id=phone_number_id,
+            waba_id=waba_id,
+            token=token,
+            invite_admin_email=invite_admin_email,
+            invite_expires_hours=invite_expires_hours,
+            background_tasks=background_tasks,
+        )
+
+    def _onboard_sync(
+        self,
+        *,
+        idempotency_key: str | None,
+        name: str,
+        timezone: str,
+        chatbot_domain: str,
+        allow_existing: bool,
+        template: str,
+        flow_name: str,
+        overwrite_flow: bool,
+        publish_flow: bool,
+        base_url: str | None,
+        run_ingestion: bool,
+        max_listings: int,
+        timeout_seconds: float,
+        max_listing_pages: int,
+        create_whatsapp_account: bool,
+        phone_number_id: str | None,
+        waba_id: str | None,
+        token: str | None,
+        invite_admin_email: str | None,
+        invite_expires_hours: int | None,
+        background_tasks: BackgroundTasks | None = None,
     ) -> OnboardTenantByUrlResult:
         tenant_name = (name or "").strip()
         if not tenant_name:
@@ -249,112 +406,35 @@ class TenantOnboardingService:
 
         run: OnboardingRun | None = None
         if key:
-            run = self.db.query(OnboardingRun).filter(OnboardingRun.idempotency_key == key).first()
-            if run:
-                if (run.request_json or {}) != req_payload:
-                    if run is not None:
-                        try:
-                            run.status = "failed"
-                            run.error_code = "idempotency_key_conflict"
-                            self.db.add(run)
-                            self.db.commit()
-                        except Exception:
-                            self.db.rollback()
-                    raise HTTPException(status_code=409, detail="idempotency_key_conflict")
-                if run.status == "completed" and run.response_json:
-                    js = run.response_json
-                    replay_invite_token: str | None = None
-                    replay_invite_email: str | None = None
-                    if js.get("invite_email") and js.get("tenant_id"):
-                        replay_invite_email = str(js.get("invite_email"))
-                        try:
-                            tenant_id = int(js.get("tenant_id") or 0)
-                            invite = (
-                                self.db.query(UserInvite)
-                                .filter(
-                                    UserInvite.tenant_id == tenant_id,
-                                    UserInvite.email == replay_invite_email,
-                                    UserInvite.used_at.is_(None),
-                                    UserInvite.expires_at > datetime.utcnow(),
-                                )
-                                .order_by(UserInvite.id.desc())
-                                .first()
-                            )
-                            if invite:
-                                replay_invite_token = str(invite.token)
-                        except Exception:
-                            replay_invite_token = None
-                    return OnboardTenantByUrlResult(
-                        tenant_id=int(js.get("tenant_id") or 0),
-                        tenant_name=str(js.get("tenant_name") or ""),
-                        chatbot_domain=str(js.get("chatbot_domain") or domain),
-                        flow_id=int(js.get("flow_id") or 0),
-                        published=bool(js.get("published")),
-                        published_version=(int(js.get("published_version")) if js.get("published_version") is not None else None),
-                        ingestion=(js.get("ingestion") if isinstance(js.get("ingestion"), dict) else None),
-                        whatsapp_account_id=(int(js.get("whatsapp_account_id")) if js.get("whatsapp_account_id") is not None else None),
-                        invite_token=replay_invite_token,
-                        invite_email=replay_invite_email,
+            req_hash = _request_hash(req_payload)
+            run = self._claim_onboarding_run(key=key, req_payload=req_payload, req_hash=req_hash)
+            if run is None:
+                # Só as colunas da decisão: response_json (potencialmente grande)
+                # fica de fora até sabermos que é um replay.
+                existing = self.db.execute(
+                    select(OnboardingRun.id, OnboardingRun.status, OnboardingRun.request_hash)
+                    .where(OnboardingRun.idempotency_key == key)
+                ).first()
+                if existing is None:
+                    raise HTTPException(status_code=409, detail="onboarding_in_progress")
+                run_id, run_status, run_hash = existing
+                if run_hash is not None:
+                    same_request = run_hash == req_hash
+                else:
+                    # Runs gravados antes do request_hash: compara o JSON.
+                    run_request = self.db.scalar(
+                        select(OnboardingRun.request_json).where(OnboardingRun.id == run_id)
                     )
-                if run.status == "in_progress":
-                    if run is not None:
-                        try:
-                            run.error_code = "onboarding_in_progress"
-                            self.db.add(run)
-                            self.db.commit()
-                        except Exception:
-                            self.db.rollback()
+                    same_request = (run_request or {}) == req_payload
+                if not same_request:
+                    self._update_onboarding_run(run_id, status="failed", error_code="idempotency_key_conflict")
+                    raise HTTPException(status_code=409, detail="idempotency_key_conflict")
+                if run_status == "in_progress":
+                    self._update_onboarding_run(run_id, error_code="onboarding_in_progress")
                     raise HTTPException(status_code=409, detail="onboarding_in_progress")
-
-            if not run:
-                run = OnboardingRun(idempotency_key=key, status="in_progress", request_json=req_payload)
-                try:
-                    self.db.add(run)
-                    self.db.commit()
-                    self.db.refresh(run)
-                except Exception:
-                    self.db.rollback()
-                    run = self.db.query(OnboardingRun).filter(OnboardingRun.idempotency_key == key).first()
-                    if run and (run.request_json or {}) != req_payload:
-                        raise HTTPException(status_code=409, detail="idempotency_key_conflict")
-                    if run and run.status == "completed" and run.response_json:
-                        js = run.response_json
-                        replay_invite_token: str | None = None
-                        replay_invite_email: str | None = None
-                        if js.get("invite_email") and js.get("tenant_id"):
-                            replay_invite_email = str(js.get("invite_email"))
-                            try:
-                                tenant_id = int(js.get("tenant_id") or 0)
-                                invite = (
-                                    self.db.query(UserInvite)
-                                    .filter(
-                                        UserInvite.tenant_id == tenant_id,
-                                        UserInvite.email == replay_invite_email,
-                                        UserInvite.used_at.is_(None),
-                                        UserInvite.expires_at > datetime.utcnow(),
-                                    )
-                                    .order_by(UserInvite.id.desc())
-                                    .first()
-                                )
-                                if invite:
-                                    replay_invite_token = str(invite.token)
-                            except Exception:
-                                replay_invite_token = None
-                        return OnboardTenantByUrlResult(
-                            tenant_id=int(js.get("tenant_id") or 0),
-                            tenant_name=str(js.get("tenant_name") or ""),
-                            chatbot_domain=str(js.get("chatbot_domain") or domain),
-                            flow_id=int(js.get("flow_id") or 0),
-                            published=bool(js.get("published")),
-                            published_version=(int(js.get("published_version")) if js.get("published_version") is not None else None),
-                            ingestion=(js.get("ingestion") if isinstance(js.get("ingestion"), dict) else None),
-                            whatsapp_account_id=(int(js.get("whatsapp_account_id")) if js.get("whatsapp_account_id") is not None else None),
-                            invite_token=replay_invite_token,
-                            invite_email=replay_invite_email,
-                        )
-                    if run and run.status == "in_progress":
-                        raise HTTPException(status_code=409, detail="onboarding_in_progress")
-                    raise
+                run = self.db.get(OnboardingRun, run_id)
+                if run is not None and run.status == "completed" and run.response_json:
+                    return self._build_replay_result(run, domain)
 
         try:
             t = self.ensure_tenant(
@@ -423,6 +503,7 @@ class TenantOnboardingService:
                 timeout_seconds=float(timeout_seconds),
                 max_listing_pages=int(max_listing_pages),
                 background_tasks=background_tasks,
+                commit=False,
             )
 
         assert t is not None
@@ -441,19 +522,23 @@ class TenantOnboardingService:
         }
 
         if run is not None:
-            try:
-                run.status = "completed"
-                run.tenant_id = int(t.id)
-                run.response_json = resp_payload
-                run.error_code = None
-                self.db.add(run)
-                self.db.commit()
-            except Exception:
-                self.db.rollback()
+            run.status = "completed"
+            run.tenant_id = int(t.id)
+            run.response_json = resp_payload
+            run.error_code = None
+            self.db.add(run)
+        # Um único commit grava a ingestão enfileirada e a conclusão do run.
+        try:
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            # Sem o CatalogIngestionRun gravado a task não tem o que processar.
+            if ingestion_out is not None:
+                raise
 
         return OnboardTenantByUrlResult(
-            tenant_id=int(t.id),
-            tenant_name=str(t.name),
+            tenant_id=int(resp_payload["tenant_id"]),
+            tenant_name=str(resp_payload["tenant_name"]),
             chatbot_domain=domain,
             flow_id=int(tpl_out.flow_id),
             published=bool(tpl_out.published),
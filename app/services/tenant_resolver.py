@@ -1,17 +1,29 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import time
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.repositories import models as core_models
 
 
-@dataclass(frozen=True)
 class TenantResolutionError(Exception):
-    status_code: int
-    detail: str
+    __slots__ = ("status_code", "detail")
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+# Cache por processo: phone_number_id -> (tenant_id, instante da resolução).
+# Roda em todo webhook inbound e o mapeamento quase nunca muda; só mapeamentos
+# encontrados entram no cache. O Tenant continua lido a cada chamada (db.get),
+# então suspensão do tenant vale na hora.
+_PNID_CACHE_TTL_SECONDS = 120.0
+_pnid_cache: dict[str, tuple[int, float]] = {}
 
 
 def resolve_tenant_id_from_input(tenant_id_value: object) -> int:
@@ -29,19 +41,24 @@ def resolve_tenant_from_phone_number_id(db: Session, phone_number_id: str | None
     if not pnid:
         raise TenantResolutionError(status_code=400, detail="missing_phone_number_id")
 
-    acct = (
-        db.query(core_models.WhatsAppAccount)
-        .filter(
-            core_models.WhatsAppAccount.phone_number_id == pnid,
-            core_models.WhatsAppAccount.is_active == True,  # noqa: E712
-        )
-        .order_by(core_models.WhatsAppAccount.id.desc())
-        .first()
-    )
-    if not acct:
-        raise TenantResolutionError(status_code=404, detail="tenant_not_mapped_for_phone_number_id")
-
-    tenant = db.get(core_models.Tenant, int(acct.tenant_id))
+    now = time.monotonic()
+    cached = _pnid_cache.get(pnid)
+    if cached is not None and now - cached[1] < _PNID_CACHE_TTL_SECONDS:
+        tenant_id = cached[0]
+    else:
+        # phone_number_id é único (uix_wa_account_phone_number): no máximo uma linha, sem ORDER BY.
+        acct_tenant_id = db.execute(
+            select(core_models.WhatsAppAccount.tenant_id).where(
+                core_models.WhatsAppAccount.phone_number_id == pnid,
+                core_models.WhatsAppAccount.is_active == True,  # noqa: E712
+            )
+        ).scalar_one_or_none()
+        if acct_tenant_id is None:
+            raise TenantResolutionError(status_code=404, detail="tenant_not_mapped_for_phone_number_id")
+        tenant_id = int(acct_tenant_id)
+        _pnid_cache[pnid] = (tenant_id, now)
+
+    tenant = db.get(core_models.Tenant, tenant_id)
     if not tenant:
         raise TenantResolutionError(status_code=404, detail="tenant_not_found_for_whatsapp_account")
 
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import threading
+import weakref
 from dataclasses import dataclass
 from datetime import datetime
 
+from app.core.logging import is_enabled_for
 from app.repositories.db import db_session
-import anyio
 
 from app.domain.catalog.models import CatalogIngestionError, CatalogIngestionRun
 from app.domain.vehicles_ingestion.service import VehicleIngestionService
@@ -18,6 +22,27 @@ class EnqueueVehicleIngestionResult:
     status: str
 
 
+class _ThreadRunner:
+    """asyncio.Runner de uma thread; fechado (loop, selector e fds) quando o holder é descartado."""
+
+    def __init__(self) -> None:
+        self.runner = asyncio.Runner()
+        # Dispara quando a thread termina (o threading.local solta o holder) ou no shutdown do processo
+        weakref.finalize(self, self.runner.close)
+
+
+_thread_runners = threading.local()
+
+
+def _job_runner() -> asyncio.Runner:
+    """Runner reaproveitado entre jobs da mesma thread do threadpool (evita anyio.run por job)."""
+    holder = getattr(_thread_runners, "holder", None)
+    if holder is None:
+        holder = _ThreadRunner()
+        _thread_runners.holder = holder
+    return holder.runner
+
+
 def run_vehicle_ingestion_job(*, tenant_id: int, run_id: int, base_url: str, max_listings: int, timeout_seconds: float, max_listing_pages: int) -> None:
     """Background job: executes vehicle ingestion and updates CatalogIngestionRun.
 
@@ -25,7 +50,8 @@ def run_vehicle_ingestion_job(*, tenant_id: int, run_id: int, base_url: str, max
     """
     logger = structlog.get_logger().bind(module="vehicle_ingestion_job", tenant_id=int(tenant_id), run_id=int(run_id))
 
-    with db_session() as db:
+    # Uma conexão para o job inteiro: o serviço faz um commit por URL processada.
+    with db_session(bind_connection=True) as db:
         run = db.get(CatalogIngestionRun, int(run_id))
         if not run:
             logger.warning("ingestion.run.missing", message="CatalogIngestionRun not found; job will not start")
@@ -34,16 +60,19 @@ def run_vehicle_ingestion_job(*, tenant_id: int, run_id: int, base_url: str, max
         run.status = "running"
         db.add(run)
         db.commit()
-        logger.info(
-            "ingestion.run.start",
-            base_url=str(base_url),
-            max_listings=int(max_listings),
-            timeout_seconds=float(timeout_seconds),
-            max_listing_pages=int(max_listing_pages),
-        )
+        if is_enabled_for(logging.INFO):
+            logger.info(
+                "ingestion.run.start",
+                base_url=str(base_url),
+                max_listings=int(max_listings),
+                timeout_seconds=float(timeout_seconds),
+                max_listing_pages=int(max_listing_pages),
+            )
+
+        service = VehicleIngestionService(db=db, tenant_id=int(tenant_id))
 
         async def _runner() -> None:
-            await VehicleIngestionService(db=db, tenant_id=int(tenant_id)).run(
+            await service.run(
                 run_id=int(run_id),
                 base_url=base_url,
                 max_listings=int(max_listings),
@@ -52,19 +81,23 @@ def run_vehicle_ingestion_job(*, tenant_id: int, run_id: int, base_url: str, max
             )
 
         try:
-            anyio.run(_runner)
-            db.refresh(run)
-            logger.info("ingestion.run.finish", status=run.status)
+            _job_runner().run(_runner())
+            # O refresh só serve ao log: pula a ida ao banco quando INFO está desligado.
+            if is_enabled_for(logging.INFO):
+                db.refresh(run)
+                logger.info("ingestion.run.finish", status=run.status)
         except Exception as e:
             full_error = traceback.format_exc()
             logger.error("ingestion.run.exception", error=str(e), traceback=full_error)
+            db.rollback()
+            # Erros por URL ainda em buffer vão no mesmo commit que marca o run como erro.
+            service.flush_errors()
             db.add(
                 CatalogIngestionError(
                     tenant_id=int(tenant_id),
                     run_id=int(run_id),
                     url=str(base_url),
-                    step="run_job",
-                    error_message=f"{str(e)}\n\n{full_error}"[:2048],
+                    error=f"run_job: {e}"[:400],
                 )
             )
             run.status = "error"
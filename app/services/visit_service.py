@@ -10,6 +10,34 @@ import re
 
 log = structlog.get_logger()
 
+_NON_DIGIT_RE = re.compile(r'\D')
+_NON_DIGIT_BYTES = bytes(b for b in range(256) if not 0x30 <= b <= 0x39)
+_DATE_RE = re.compile(r'(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?')
+_TIME_RE = re.compile(r'(\d{1,2})(?:[h:](\d{2}))?')
+
+# Dias da semana: uma única varredura por palavra inteira ("quando" não casa "qua")
+_WEEKDAY_NUM = {
+    "segunda": 0, "seg": 0,
+    "terça": 1, "terca": 1, "ter": 1,
+    "quarta": 2, "qua": 2,
+    "quinta": 3, "qui": 3,
+    "sexta": 4, "sex": 4,
+    "sábado": 5, "sabado": 5, "sab": 5,
+    "domingo": 6, "dom": 6,
+}
+
+# Atalhos relativos + dias da semana em uma única varredura; o grupo nomeado
+# que casou (lastgroup) diz o tipo. "depois de amanhã" vem antes de "amanh".
+_DAY_OFFSET = {"depois": 2, "hoje": 0, "amanha": 1}
+_DATE_TOKEN_RE = re.compile(
+    r'(?P<depois>depois\s+de\s+amanh)|(?P<hoje>hoje)|(?P<amanha>amanh)'
+    r'|\b(?P<weekday>' + '|'.join(_WEEKDAY_NUM) + r')\b'
+)
+
+# Períodos genéricos; início de palavra para "amanhã" não virar "manhã"
+_PERIOD_TIME = {"manh": (9, 0), "tarde": (14, 0), "noite": (19, 0)}
+_PERIOD_RE = re.compile(r'\b(manh|tarde|noite)')
+
 
 class VisitService:
     """Serviço para criar e gerenciar agendamentos de visitas."""
@@ -100,7 +128,7 @@ class VisitService:
     @staticmethod
     def confirm_visit(db: Session, visit_id: int) -> VisitSchedule:
         """Confirma um agendamento de visita."""
-        visit = db.query(VisitSchedule).filter(VisitSchedule.id == visit_id).first()
+        visit = db.get(VisitSchedule, visit_id)
         if not visit:
             raise ValueError(f"Visit {visit_id} not found")
         
@@ -108,7 +136,7 @@ class VisitService:
         visit.updated_at = datetime.utcnow()
 
         # Ao confirmar a visita, marcar lead como agendado (confirmado pela equipe)
-        lead = db.query(Lead).filter(Lead.id == visit.lead_id).first()
+        lead = db.get(Lead, visit.lead_id)
         if lead:
             lead.status = "agendado"
             lead.status_updated_at = datetime.utcnow()
@@ -121,7 +149,7 @@ class VisitService:
     @staticmethod
     def cancel_visit(db: Session, visit_id: int, reason: Optional[str] = None) -> VisitSchedule:
         """Cancela um agendamento de visita."""
-        visit = db.query(VisitSchedule).filter(VisitSchedule.id == visit_id).first()
+        visit = db.get(VisitSchedule, visit_id)
         if not visit:
             raise ValueError(f"Visit {visit_id} not found")
         
@@ -143,8 +171,11 @@ class VisitService:
         Returns:
             (is_valid, formatted_phone)
         """
-        # Remove tudo que não é dígito
-        digits = re.sub(r'\D', '', text)
+        # Remove tudo que não é dígito (ASCII via bytes.translate; regex só para Unicode)
+        try:
+            digits = text.encode('ascii').translate(None, _NON_DIGIT_BYTES).decode('ascii')
+        except UnicodeEncodeError:
+            digits = _NON_DIGIT_RE.sub('', text)
         
         # Aceitar formatos: 11964442592, 5511964442592, +5511964442592
         if len(digits) == 11:  # DDD + número
@@ -169,33 +200,20 @@ class VisitService:
         text_lower = text.lower().strip()
         today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # Atalhos
-        if "hoje" in text_lower:
-            return today
-        if "amanh" in text_lower:  # amanhã, amanha
-            return today + timedelta(days=1)
-        if "depois" in text_lower and "amanh" in text_lower:
-            return today + timedelta(days=2)
-        
-        # Dias da semana
-        weekdays = {
-            "segunda": 0, "seg": 0,
-            "terça": 1, "terca": 1, "ter": 1,
-            "quarta": 2, "qua": 2,
-            "quinta": 3, "qui": 3,
-            "sexta": 4, "sex": 4,
-            "sábado": 5, "sabado": 5, "sab": 5,
-            "domingo": 6, "dom": 6
-        }
-        for day_name, day_num in weekdays.items():
-            if day_name in text_lower:
-                days_ahead = (day_num - today.weekday()) % 7
-                if days_ahead == 0:
-                    days_ahead = 7  # Próxima semana
-                return today + timedelta(days=days_ahead)
+        # Atalhos (hoje, amanhã, depois de amanhã) e dias da semana
+        token = _DATE_TOKEN_RE.search(text_lower)
+        if token:
+            kind = token.lastgroup
+            if kind != "weekday":
+                return today + timedelta(days=_DAY_OFFSET[kind])
+            day_num = _WEEKDAY_NUM[token.group(kind)]
+            days_ahead = (day_num - today.weekday()) % 7
+            if days_ahead == 0:
+                days_ahead = 7  # Próxima semana
+            return today + timedelta(days=days_ahead)
         
         # Formato DD/MM ou DD/MM/YYYY
-        match = re.search(r'(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?', text)
+        match = _DATE_RE.search(text)
         if match:
             day = int(match.group(1))
             month = int(match.group(2))
@@ -221,15 +239,13 @@ class VisitService:
         text_lower = text.lower().strip()
         
         # Períodos genéricos
-        if "manh" in text_lower:
-            return visit_date.replace(hour=9, minute=0)
-        if "tarde" in text_lower:
-            return visit_date.replace(hour=14, minute=0)
-        if "noite" in text_lower:
-            return visit_date.replace(hour=19, minute=0)
+        period_match = _PERIOD_RE.search(text_lower)
+        if period_match:
+            hour, minute = _PERIOD_TIME[period_match.group(1)]
+            return visit_date.replace(hour=hour, minute=minute)
         
         # Formato HH:MM ou HHhMM ou HH
-        match = re.search(r'(\d{1,2})(?:[h:](\d{2}))?', text)
+        match = _TIME_RE.search(text)
         if match:
             hour = int(match.group(1))
             minute = int(match.group(2)) if match.group(2) else 0
@@ -254,7 +270,7 @@ class VisitService:
             ID do agendamento criado
         """
         # Buscar tenant_id do lead
-        lead = db.query(Lead).filter(Lead.id == lead_id).first()
+        lead = db.get(Lead, lead_id)
         tenant_id = lead.tenant_id if lead else 1
         
         now = datetime.utcnow()
@@ -273,15 +289,14 @@ class VisitService:
             updated_at=now
         )
         
+        # Atualizar status do lead na mesma transação do agendamento
+        if lead:
+            lead.status = "agendamento_pendente"
+        
         db.add(visit)
         db.commit()
         db.refresh(visit)
         
-        # Atualizar status do lead
-        if lead:
-            lead.status = "agendamento_pendente"
-            db.commit()
-        
         log.info(
             "visit_created",
             visit_id=visit.id,
@@ -4,6 +4,7 @@ from app.workers.celery_app import celery
 import structlog
 from app.repositories.db import db_session
 from app.repositories import models
+from app.domain.policies import next_business_open
 from app.workers.tasks_outbound import send_text as task_send_text
 from app.workers.tasks_outbound import send_template as task_send_template
 from datetime import datetime, timedelta
@@ -73,13 +74,16 @@ def set_status_task(self: Task, order_id: int, target_status: str):
                 tpl = map_tpl.get(order.status)
                 idem = f"order-status-{order.id}-{order.status.value}"
                 if tpl:
-                    task_send_template.delay(
-                        tenant_id=str(int(tenant.id)) if tenant else "0",
-                        to_wa_id=customer.wa_id,
-                        template_name=tpl,
-                        language_code=lang,
-                        components=[],
-                        idempotency_key=idem,
+                    task_send_template.apply_async(
+                        kwargs={
+                            "tenant_id": str(int(tenant.id)) if tenant else "0",
+                            "to_wa_id": customer.wa_id,
+                            "template_name": tpl,
+                            "language_code": lang,
+                            "components": [],
+                            "idempotency_key": idem,
+                        },
+                        eta=next_business_open(),
                     )
                 else:
                     msg = {
@@ -89,11 +93,14 @@ def set_status_task(self: Task, order_id: int, target_status: str):
                         models.OrderStatus.delivered: "Pedido entregue. Bom apetite!",
                         models.OrderStatus.canceled: "Seu pedido foi cancelado.",
                     }.get(order.status, f"Status do pedido atualizado: {order.status.value}")
-                    task_send_text.delay(
-                        tenant_id=str(int(order.tenant_id)),
-                        to_wa_id=customer.wa_id,
-                        text=msg,
-                        idempotency_key=idem,
+                    task_send_text.apply_async(
+                        kwargs={
+                            "tenant_id": str(int(order.tenant_id)),
+                            "to_wa_id": customer.wa_id,
+                            "text": msg,
+                            "idempotency_key": idem,
+                        },
+                        eta=next_business_open(),
                     )
         except Exception:
             pass
@@ -165,11 +172,14 @@ def check_sla_alerts(self: Task):
                     )
                     if channel == "whatsapp" and ops_wa:
                         try:
-                            task_send_text.delay(
-                                tenant_id=str(int(t.id)),
-                                to_wa_id=ops_wa,
-                                text=msg,
-                                idempotency_key=f"sla-alert-{o.id}-{o.status.value}",
+                            task_send_text.apply_async(
+                                kwargs={
+                                    "tenant_id": str(int(t.id)),
+                                    "to_wa_id": ops_wa,
+                                    "text": msg,
+                                    "idempotency_key": f"sla-alert-{o.id}-{o.status.value}",
+                                },
+                                eta=next_business_open(),
                             )
                         except Exception:
                             log.warning("sla_alert_send_failed", order_id=o.id)
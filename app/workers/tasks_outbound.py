@@ -3,9 +3,10 @@ import random
 import time
 import structlog
 from celery import Task
+from sqlalchemy import and_, select
 from app.core.config import settings
-from app.domain.policies import within_business_hours
-from app.repositories.db import db_session
+from app.domain.policies import next_business_open, within_business_hours
+from app.repositories.db import db_session, dialect_insert
 from app.repositories import models
 from app.messaging.provider import get_provider
 from .celery_app import celery
@@ -27,10 +28,13 @@ def _backoff(retry_count: int) -> float:
     return min(30.0, base + jitter)
 
 
-def _resolve_tenant(db, raw_tenant_id) -> models.Tenant | None:
-    tid = str(raw_tenant_id or "").strip()
-    if not tid:
-        return None
+# Cache por processo: tenant_id bruto -> (id do Tenant, instante da resolução).
+# Tenants mudam raramente; evita um SELECT por mensagem enviada.
+_TENANT_CACHE_TTL_SECONDS = 60.0
+_tenant_cache: dict[str, tuple[int, float]] = {}
+
+
+def _lookup_tenant(db, tid: str) -> models.Tenant | None:
     try:
         t_int = int(tid)
         return db.get(models.Tenant, t_int)
@@ -38,96 +42,172 @@ def _resolve_tenant(db, raw_tenant_id) -> models.Tenant | None:
         pass
     if (settings.APP_ENV or "").lower() == "prod":
         return None
-    return db.query(models.Tenant).filter(models.Tenant.name == tid).first()
+    return db.scalars(select(models.Tenant).where(models.Tenant.name == tid).limit(1)).first()
+
+
+def _resolve_tenant_id(db, raw_tenant_id) -> int | None:
+    tid = str(raw_tenant_id or "").strip()
+    if not tid:
+        return None
+    now = time.monotonic()
+    cached = _tenant_cache.get(tid)
+    if cached is not None and now - cached[1] < _TENANT_CACHE_TTL_SECONDS:
+        return cached[0]
+    tenant = _lookup_tenant(db, tid)
+    if tenant is None:
+        return None
+    tenant_pk = int(tenant.id)
+    _tenant_cache[tid] = (tenant_pk, now)
+    return tenant_pk
+
+
+def _idempotency_key_taken(db, tenant_pk: int, idempotency_key: str) -> bool:
+    return (
+        db.scalar(
+            select(models.Message.id)
+            .where(models.Message.tenant_id == tenant_pk, models.Message.idempotency_key == idempotency_key)
+            .limit(1)
+        )
+        is not None
+    )
+
+
+def _get_or_create_contact_id(db, tenant_pk: int, wa_id: str) -> int:
+    insert_fn = dialect_insert(db)
+    if insert_fn is not None:
+        # INSERT ... ON CONFLICT em (tenant_id, wa_id): sem corrida entre workers.
+        contact_id = db.scalar(
+            insert_fn(models.Contact)
+            .values(tenant_id=tenant_pk, wa_id=wa_id)
+            .on_conflict_do_nothing(index_elements=["tenant_id", "wa_id"])
+            .returning(models.Contact.id)
+        )
+        if contact_id is None:
+            contact_id = db.scalar(
+                select(models.Contact.id).where(models.Contact.tenant_id == tenant_pk, models.Contact.wa_id == wa_id)
+            )
+        return int(contact_id)
+    contact = models.Contact(tenant_id=tenant_pk, wa_id=wa_id)
+    db.add(contact)
+    db.flush()
+    return int(contact.id)
+
+
+def _get_or_create_conversation_id(db, tenant_pk: int, wa_id: str) -> int:
+    """Contato + conversa aberta em um único SELECT; só insere o que faltar."""
+    row = db.execute(
+        select(models.Contact.id, models.Conversation.id)
+        .outerjoin(
+            models.Conversation,
+            and_(
+                models.Conversation.contact_id == models.Contact.id,
+                models.Conversation.tenant_id == tenant_pk,
+                models.Conversation.status != models.ConversationStatus.closed,
+            ),
+        )
+        .where(models.Contact.tenant_id == tenant_pk, models.Contact.wa_id == wa_id)
+        .order_by(models.Conversation.id.desc())
+        .limit(1)
+    ).first()
+    if row is not None and row[1] is not None:
+        return int(row[1])
+    contact_id = int(row[0]) if row is not None else _get_or_create_contact_id(db, tenant_pk, wa_id)
+    convo = models.Conversation(tenant_id=tenant_pk, contact_id=contact_id)
+    db.add(convo)
+    db.flush()
+    return int(convo.id)
+
+
+def _queue_message(
+    db,
+    tenant_pk: int,
+    to_wa_id: str,
+    msg_type: str,
+    payload: dict,
+    idempotency_key: str | None,
+) -> int | None:
+    """Registra a mensagem outbound como queued (conversa criada sob demanda) e retorna seu id.
+
+    Retorna None quando a idempotency_key já foi usada no tenant (duplicata).
+    """
+    values = {
+        "tenant_id": tenant_pk,
+        "conversation_id": _get_or_create_conversation_id(db, tenant_pk, to_wa_id),
+        "direction": models.MessageDirection.outbound,
+        "type": msg_type,
+        "payload": payload,
+        "status": "queued",
+        "idempotency_key": idempotency_key,
+    }
+    insert_fn = dialect_insert(db)
+    if insert_fn is not None:
+        # A checagem de duplicata é o próprio INSERT: ON CONFLICT em (tenant_id, idempotency_key).
+        stmt = insert_fn(models.Message).values(**values)
+        if idempotency_key:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["tenant_id", "idempotency_key"])
+        msg_id = db.scalar(stmt.returning(models.Message.id))
+        if msg_id is None:
+            db.rollback()
+            return None
+        db.commit()
+        return int(msg_id)
+
+    if idempotency_key and _idempotency_key_taken(db, tenant_pk, idempotency_key):
+        db.rollback()
+        return None
+    msg = models.Message(**values)
+    db.add(msg)
+    db.flush()
+    msg_id = int(msg.id)
+    db.commit()
+    return msg_id
+
+
+def _mark_sent(msg_id: int, resp: dict) -> None:
+    # Pela PK da mensagem registrada: tasks concorrentes do mesmo tenant não se sobrescrevem.
+    with db_session() as db:
+        msg = db.get(models.Message, msg_id)
+        if msg is not None and msg.status == "queued":
+            msg.status = "sent"
+            msg.payload = {**(msg.payload or {}), "wa_response": resp}
+            db.commit()
 
 
 @celery.task(name="outbound.send_text", bind=True, max_retries=5)
 def send_text(self: Task, tenant_id: str, to_wa_id: str, text: str, idempotency_key: str | None = None) -> dict:
-    # Respect business hours (simple policy for now)
+    # Respect business hours (simple policy for now): callers already enqueue with an ETA;
+    # a task that still arrives off-hours is re-enqueued for the next opening, never dropped.
     if not within_business_hours():
-        log.info("outbound_skipped_off_hours", tenant_id=tenant_id, to=to_wa_id)
+        eta = next_business_open()
+        self.apply_async(
+            kwargs={"tenant_id": tenant_id, "to_wa_id": to_wa_id, "text": text, "idempotency_key": idempotency_key},
+            eta=eta,
+        )
+        log.info("outbound_deferred_off_hours", tenant_id=tenant_id, to=to_wa_id, eta=eta.isoformat())
         return {"status": "scheduled"}
 
     with db_session() as db:
-        tenant = _resolve_tenant(db, tenant_id)
-        if tenant is None:
+        tenant_pk = _resolve_tenant_id(db, tenant_id)
+        if tenant_pk is None:
             return {"status": "error", "error": "tenant_not_found"}
 
-        # Idempotency guard
-        if idempotency_key:
-            existing = (
-                db.query(models.Message)
-                .filter(
-                    models.Message.tenant_id == tenant.id,
-                    models.Message.idempotency_key == idempotency_key,
-                )
-                .first()
-            )
-            if existing is not None:
-                log.info("outbound_idempotent_skip", tenant_id=tenant_id, key=idempotency_key)
-                return {"status": "duplicate"}
-
-        # Create conversation on demand (outbound-only)
-        contact = (
-            db.query(models.Contact)
-            .filter(models.Contact.tenant_id == tenant.id, models.Contact.wa_id == to_wa_id)
-            .first()
-        )
-        if contact is None:
-            contact = models.Contact(tenant_id=tenant.id, wa_id=to_wa_id)
-            db.add(contact)
-            db.flush()
-
-        convo = (
-            db.query(models.Conversation)
-            .filter(
-                models.Conversation.tenant_id == tenant.id,
-                models.Conversation.contact_id == contact.id,
-                models.Conversation.status != models.ConversationStatus.closed,
-            )
-            .order_by(models.Conversation.id.desc())
-            .first()
-        )
-        if convo is None:
-            convo = models.Conversation(tenant_id=tenant.id, contact_id=contact.id)
-            db.add(convo)
-            db.flush()
-
-        # Record message as queued
-        msg = models.Message(
-            tenant_id=tenant.id,
-            conversation_id=convo.id,
-            direction=models.MessageDirection.outbound,
-            type="text",
-            payload={"text": text},
-            status="queued",
-            idempotency_key=idempotency_key,
-        )
-        db.add(msg)
-        db.commit()
+        # Create conversation on demand (outbound-only) and record message as queued;
+        # the insert itself is the idempotency guard
+        msg_id = _queue_message(db, tenant_pk, to_wa_id, "text", {"text": text}, idempotency_key)
+        if msg_id is None:
+            log.info("outbound_idempotent_skip", tenant_id=tenant_id, key=idempotency_key)
+            return {"status": "duplicate"}
 
     try:
         provider = get_provider()
-        resp = provider.send_text(to=to_wa_id, text=text, tenant_id=str(int(tenant.id)))
+        resp = provider.send_text(to=to_wa_id, text=text, tenant_id=str(tenant_pk))
     except Exception as e:
         retry_no = self.request.retries
         delay = _backoff(retry_no)
         log.warning("outbound_retry", retries=retry_no + 1, delay=delay)
         raise self.retry(exc=TransientSendError(str(e)), countdown=delay)
 
-    # Mark as sent
-    with db_session() as db:
-        last = (
-            db.query(models.Message)
-            .filter(models.Message.tenant_id == tenant.id)
-            .order_by(models.Message.id.desc())
-            .first()
-        )
-        if last is not None and last.status == "queued":
-            last.status = "sent"
-            last.payload = {**(last.payload or {}), "wa_response": resp}
-            db.add(last)
-            db.commit()
+    _mark_sent(msg_id, resp)
 
     return {"status": "sent", "response": resp}
 
@@ -144,67 +224,41 @@ def send_template(
 ) -> dict:
     # Template messages podem ser enviadas fora do horário, mas mantemos a mesma política por simplicidade
     if not within_business_hours():
-        log.info("outbound_template_skipped_off_hours", tenant_id=tenant_id, to=to_wa_id)
+        eta = next_business_open()
+        self.apply_async(
+            kwargs={
+                "tenant_id": tenant_id,
+                "to_wa_id": to_wa_id,
+                "template_name": template_name,
+                "language_code": language_code,
+                "components": components,
+                "idempotency_key": idempotency_key,
+            },
+            eta=eta,
+        )
+        log.info("outbound_template_deferred_off_hours", tenant_id=tenant_id, to=to_wa_id, eta=eta.isoformat())
         return {"status": "scheduled"}
 
     with db_session() as db:
-        tenant = _resolve_tenant(db, tenant_id)
-        if tenant is None:
+        tenant_pk = _resolve_tenant_id(db, tenant_id)
+        if tenant_pk is None:
             return {"status": "error", "error": "tenant_not_found"}
 
-        if idempotency_key:
-            existing = (
-                db.query(models.Message)
-                .filter(
-                    models.Message.tenant_id == tenant.id,
-                    models.Message.idempotency_key == idempotency_key,
-                )
-                .first()
-            )
-            if existing is not None:
-                log.info("outbound_template_idempotent_skip", tenant_id=tenant_id, key=idempotency_key)
-                return {"status": "duplicate"}
-
-        contact = (
-            db.query(models.Contact)
-            .filter(models.Contact.tenant_id == tenant.id, models.Contact.wa_id == to_wa_id)
-            .first()
-        )
-        if contact is None:
-            contact = models.Contact(tenant_id=tenant.id, wa_id=to_wa_id)
-            db.add(contact)
-            db.flush()
-
-        convo = (
-            db.query(models.Conversation)
-            .filter(
-                models.Conversation.tenant_id == tenant.id,
-                models.Conversation.contact_id == contact.id,
-                models.Conversation.status != models.ConversationStatus.closed,
-            )
-            .order_by(models.Conversation.id.desc())
-            .first()
-        )
-        if convo is None:
-            convo = models.Conversation(tenant_id=tenant.id, contact_id=contact.id)
-            db.add(convo)
-            db.flush()
-
-        msg = models.Message(
-            tenant_id=tenant.id,
-            conversation_id=convo.id,
-            direction=models.MessageDirection.outbound,
-            type="template",
-            payload={
+        msg_id = _queue_message(
+            db,
+            tenant_pk,
+            to_wa_id,
+            "template",
+            {
                 "template": template_name,
                 "language_code": language_code,
                 "components": components or [],
             },
-            status="queued",
-            idempotency_key=idempotency_key,
+            idempotency_key,
         )
-        db.add(msg)
-        db.commit()
+        if msg_id is None:
+            log.info("outbound_template_idempotent_skip", tenant_id=tenant_id, key=idempotency_key)
+            return {"status": "duplicate"}
 
     try:
         provider = get_provider()
@@ -213,7 +267,7 @@ def send_template(
             template_name=template_name,
             language=language_code,
             components=components,
-            tenant_id=str(int(tenant.id)),
+            tenant_id=str(tenant_pk),
         )
     except Exception as e:
         retry_no = self.request.retries
@@ -221,17 +275,6 @@ def send_template(
         log.warning("outbound_template_retry", retries=retry_no + 1, delay=delay)
         raise self.retry(exc=TransientSendError(str(e)), countdown=delay)
 
-    with db_session() as db:
-        last = (
-            db.query(models.Message)
-            .filter(models.Message.tenant_id == tenant.id)
-            .order_by(models.Message.id.desc())
-            .first()
-        )
-        if last is not None and last.status == "queued":
-            last.status = "sent"
-            last.payload = {**(last.payload or {}), "wa_response": resp}
-            db.add(last)
-            db.commit()
+    _mark_sent(msg_id, resp)
 
     return {"status": "sent", "response": resp}
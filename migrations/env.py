@@ -4,7 +4,7 @@ from app.core.config import settings
 
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config, create_engine
+from sqlalchemy import engine_from_config, create_engine, event
 from sqlalchemy import pool
 
 from alembic import context
@@ -58,6 +58,28 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+def _sqlite_single_transaction(engine) -> None:
+    """Roda o DDL do SQLite numa única transação real.
+
+    O pysqlite só abre BEGIN implícito antes de DML, então cada CREATE INDEX/ALTER
+    seria commitado (e sincronizado em disco) isoladamente. Desligamos o controle
+    do driver e emitimos BEGIN nós mesmos; os PRAGMAs valem só para esta conexão.
+    """
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode.
 
@@ -67,6 +89,8 @@ def run_migrations_online() -> None:
     """
     # Usar diretamente a URL do app para evitar problemas de parsing do alembic.ini
     connectable = create_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    if connectable.dialect.name == "sqlite":
+        _sqlite_single_transaction(connectable)
 
     with connectable.connect() as connection:
         context.configure(
@@ -26,6 +26,8 @@ def upgrade() -> None:
     if "re_chatbot_flows" in insp.get_table_names():
         return
 
+    # Cria já o schema final da tabela (domain na unique, campos de arquivamento):
+    # em banco novo, c3f1a2b4c5d6 / f1a2b3c4d5e7 / f1a2b3c4d5e8 detectam e não fazem nada.
     op.create_table(
         "re_chatbot_flows",
         sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
@@ -33,20 +35,24 @@ def upgrade() -> None:
         sa.Column("domain", sa.String(length=64), nullable=False, server_default="real_estate", index=True),
         sa.Column("name", sa.String(length=160), nullable=False),
         sa.Column("flow_definition", sa.JSON(), nullable=False),
-        sa.Column("is_published", sa.Boolean(), nullable=False, server_default=sa.text("false"), index=True),
+        sa.Column("is_published", sa.Boolean(), nullable=False, server_default=sa.text("false")),
         sa.Column("published_version", sa.Integer(), nullable=False, server_default="0"),
         sa.Column("published_at", sa.DateTime(), nullable=True),
         sa.Column("published_by", sa.String(length=180), nullable=True),
+        sa.Column("is_archived", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
         sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
         sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
-        sa.UniqueConstraint("tenant_id", "name", name="uix_re_chatbot_flow_tenant_name"),
+        sa.UniqueConstraint("tenant_id", "domain", "name", name="uix_re_chatbot_flow_tenant_domain_name"),
     )
 
     op.create_index(
-        "idx_re_chatbot_flow_tenant_domain_published",
+        "idx_re_chatbot_flow_published",
         "re_chatbot_flows",
-        ["tenant_id", "domain", "is_published"],
+        ["tenant_id", "domain"],
         unique=False,
+        postgresql_where=sa.text("is_published = true"),
+        sqlite_where=sa.text("is_published = 1"),
     )
 
 
@@ -56,5 +62,5 @@ def downgrade() -> None:
     if "re_chatbot_flows" not in insp.get_table_names():
         return
 
-    op.drop_index("idx_re_chatbot_flow_tenant_domain_published", table_name="re_chatbot_flows")
+    op.drop_index("idx_re_chatbot_flow_published", table_name="re_chatbot_flows")
     op.drop_table("re_chatbot_flows")
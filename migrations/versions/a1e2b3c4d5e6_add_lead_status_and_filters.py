@@ -19,16 +19,15 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     bind = op.get_bind()
-    # Usar PRAGMA para detectar colunas no SQLite de forma confiável
-    try:
-        rows = bind.exec_driver_sql("PRAGMA table_info('re_leads')").fetchall()
-        existing_cols = {row[1] for row in rows}  # (cid, name, type, notnull, dflt_value, pk)
-    except Exception:
-        # Fallback para outros dialetos
-        insp = sa.inspect(bind)
-        existing_cols = {c["name"] for c in insp.get_columns("re_leads")}
-
-    # 1) Adicionar colunas (sem FKs/índices)
+    # Um único inspector para a migração inteira; depois só bookkeeping em Python.
+    # (O batch do SQLite recria a tabela preservando nomes de FKs/índices.)
+    insp = sa.inspect(bind)
+    existing_cols = {c["name"] for c in insp.get_columns("re_leads")}
+    existing_fks = {fk.get("name") for fk in insp.get_foreign_keys("re_leads")}
+    existing_idxs = {ix.get("name") for ix in insp.get_indexes("re_leads")}
+
+    # 1) Colunas e FKs num único batch: no SQLite a tabela é recopiada uma só vez
+    missing_fks = {"fk_re_leads_property_interest", "fk_re_leads_contact"} - existing_fks
     with op.batch_alter_table("re_leads", schema=None) as batch_op:
         if "status" not in existing_cols:
             batch_op.add_column(sa.Column("status", sa.String(length=32), nullable=False, server_default="novo"))
@@ -61,21 +60,20 @@ def upgrade() -> None:
         if "preco_max" not in existing_cols:
             batch_op.add_column(sa.Column("preco_max", sa.Float(), nullable=True))
 
-    # Recarregar metadados após recriação
-    insp = sa.inspect(op.get_bind())
-    existing_fks = {fk.get("name") for fk in insp.get_foreign_keys("re_leads")}
-    existing_idxs = {ix.get("name") for ix in insp.get_indexes("re_leads")}
+        # Índices das colunas de FK antes das FKs: o check referencial não varre re_leads
+        if "idx_re_leads_property_interest" not in existing_idxs:
+            batch_op.create_index("idx_re_leads_property_interest", ["property_interest_id"], unique=False)
+        if "idx_re_leads_contact" not in existing_idxs:
+            batch_op.create_index("idx_re_leads_contact", ["contact_id"], unique=False)
 
-    # 2) Criar FKs em batch separado (evita reordenação circular)
-    with op.batch_alter_table("re_leads", schema=None) as batch_op:
-        if "fk_re_leads_property_interest" not in existing_fks:
+        if "fk_re_leads_property_interest" in missing_fks:
             batch_op.create_foreign_key(
                 "fk_re_leads_property_interest",
                 "re_properties",
                 ["property_interest_id"],
                 ["id"],
             )
-        if "fk_re_leads_contact" not in existing_fks:
+        if "fk_re_leads_contact" in missing_fks:
             batch_op.create_foreign_key(
                 "fk_re_leads_contact",
                 "contacts",
@@ -83,7 +81,7 @@ def upgrade() -> None:
                 ["id"],
             )
 
-    # 3) Criar índices fora do batch (CREATE INDEX é suportado)
+    # 2) Criar índices fora do batch (CREATE INDEX é suportado)
     if "idx_re_leads_tenant_status" not in existing_idxs:
         op.create_index("idx_re_leads_tenant_status", "re_leads", ["tenant_id", "status"], unique=False)
     if "idx_re_leads_city" not in existing_idxs:
@@ -100,40 +98,58 @@ def upgrade() -> None:
         op.create_index("idx_re_leads_preco_min", "re_leads", ["preco_min"], unique=False)
     if "idx_re_leads_preco_max" not in existing_idxs:
         op.create_index("idx_re_leads_preco_max", "re_leads", ["preco_max"], unique=False)
-    if "idx_re_leads_property_interest" not in existing_idxs:
-        op.create_index("idx_re_leads_property_interest", "re_leads", ["property_interest_id"], unique=False)
 
 
 def downgrade() -> None:
-    # 1) Dropar índices
-    op.drop_index("idx_re_leads_property_interest", table_name="re_leads")
-    op.drop_index("idx_re_leads_preco_max", table_name="re_leads")
-    op.drop_index("idx_re_leads_preco_min", table_name="re_leads")
-    op.drop_index("idx_re_leads_dormitorios", table_name="re_leads")
-    op.drop_index("idx_re_leads_purpose_type", table_name="re_leads")
-    op.drop_index("idx_re_leads_bairro", table_name="re_leads")
-    op.drop_index("idx_re_leads_state", table_name="re_leads")
-    op.drop_index("idx_re_leads_city", table_name="re_leads")
-    op.drop_index("idx_re_leads_tenant_status", table_name="re_leads")
-
-    # 2) Dropar FKs
-    with op.batch_alter_table("re_leads", schema=None) as batch_op:
-        batch_op.drop_constraint("fk_re_leads_contact", type_="foreignkey")
-        batch_op.drop_constraint("fk_re_leads_property_interest", type_="foreignkey")
+    bind = op.get_bind()
+    # Idempotente: só remove o que ainda existe (downgrade repetido ou upgrade parcial).
+    insp = sa.inspect(bind)
+    existing_cols = {c["name"] for c in insp.get_columns("re_leads")}
+    existing_fks = {fk.get("name") for fk in insp.get_foreign_keys("re_leads")}
+    existing_idxs = {ix.get("name") for ix in insp.get_indexes("re_leads")}
 
-    # 3) Remover colunas
+    # 1) Dropar índices
+    for name in (
+        "idx_re_leads_contact",
+        "idx_re_leads_property_interest",
+        "idx_re_leads_preco_max",
+        "idx_re_leads_preco_min",
+        "idx_re_leads_dormitorios",
+        "idx_re_leads_purpose_type",
+        "idx_re_leads_bairro",
+        "idx_re_leads_state",
+        "idx_re_leads_city",
+        "idx_re_leads_tenant_status",
+    ):
+        if name in existing_idxs:
+            op.drop_index(name, table_name="re_leads")
+
+    # 2) Dropar FKs e colunas no mesmo batch (uma recópia da tabela)
+    fks = [name for name in ("fk_re_leads_contact", "fk_re_leads_property_interest") if name in existing_fks]
+    cols = [
+        col
+        for col in (
+            "contact_id",
+            "property_interest_id",
+            "preco_max",
+            "preco_min",
+            "dormitorios",
+            "bairro",
+            "estado",
+            "cidade",
+            "tipo",
+            "finalidade",
+            "status_updated_at",
+            "last_outbound_at",
+            "last_inbound_at",
+            "status",
+        )
+        if col in existing_cols
+    ]
+    if not fks and not cols:
+        return
     with op.batch_alter_table("re_leads", schema=None) as batch_op:
-        batch_op.drop_column("contact_id")
-        batch_op.drop_column("property_interest_id")
-        batch_op.drop_column("preco_max")
-        batch_op.drop_column("preco_min")
-        batch_op.drop_column("dormitorios")
-        batch_op.drop_column("bairro")
-        batch_op.drop_column("estado")
-        batch_op.drop_column("cidade")
-        batch_op.drop_column("tipo")
-        batch_op.drop_column("finalidade")
-        batch_op.drop_column("status_updated_at")
-        batch_op.drop_column("last_outbound_at")
-        batch_op.drop_column("last_inbound_at")
-        batch_op.drop_column("status")
+        for name in fks:
+            batch_op.drop_constraint(name, type_="foreignkey")
+        for col in cols:
+            batch_op.drop_column(col)
@@ -0,0 +1,52 @@
+"""re_leads: (tenant_id, tipo, finalidade) no lugar de idx_re_leads_purpose_type
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-01-14
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3b4c5d6e7f8"
+down_revision: Union[str, Sequence[str], None] = "f2a3b4c5d6e7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "idx_re_leads_tenant_type_purpose"
+# a1e2b3c4d5e6: (finalidade, tipo) sem tenant e liderado pela coluna de ~3 valores.
+OLD_INDEX_NAME = "idx_re_leads_purpose_type"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_leads" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("re_leads")}
+    if INDEX_NAME not in existing:
+        op.create_index(INDEX_NAME, "re_leads", ["tenant_id", "tipo", "finalidade"], unique=False)
+    if OLD_INDEX_NAME in existing:
+        op.drop_index(OLD_INDEX_NAME, table_name="re_leads")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_leads" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("re_leads")}
+    if OLD_INDEX_NAME not in existing:
+        op.create_index(OLD_INDEX_NAME, "re_leads", ["finalidade", "tipo"], unique=False)
+    if INDEX_NAME in existing:
+        op.drop_index(INDEX_NAME, table_name="re_leads")
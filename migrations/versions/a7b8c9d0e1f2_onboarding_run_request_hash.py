@@ -0,0 +1,50 @@
+"""onboarding_runs: request_hash
+
+Revision ID: a7b8c9d0e1f2
+Revises: e4b5c6d7f8a9
+Create Date: 2026-01-12
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7b8c9d0e1f2"
+down_revision: Union[str, Sequence[str], None] = "e4b5c6d7f8a9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(insp: sa.Inspector, table: str, col: str) -> bool:
+    return any(c.get("name") == col for c in insp.get_columns(table))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    # onboarding_runs é criada pelo create_all da aplicação.
+    if "onboarding_runs" not in insp.get_table_names():
+        return
+
+    if not _has_column(insp, "onboarding_runs", "request_hash"):
+        op.add_column(
+            "onboarding_runs",
+            sa.Column("request_hash", sa.String(length=32), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "onboarding_runs" not in insp.get_table_names():
+        return
+
+    if _has_column(insp, "onboarding_runs", "request_hash"):
+        with op.batch_alter_table("onboarding_runs") as batch_op:
+            batch_op.drop_column("request_hash")
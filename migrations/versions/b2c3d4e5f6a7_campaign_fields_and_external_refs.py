@@ -17,45 +17,32 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
-def _get_existing_columns(table_name: str) -> set[str]:
+def upgrade() -> None:
     bind = op.get_bind()
-    try:
-        rows = bind.exec_driver_sql(f"PRAGMA table_info('{table_name}')").fetchall()
-        return {row[1] for row in rows}
-    except Exception:
-        insp = sa.inspect(bind)
-        return {c["name"] for c in insp.get_columns(table_name)}
-
+    # Um único inspector para a migração inteira; depois só bookkeeping em Python.
+    insp = sa.inspect(bind)
+    existing_tables = set(insp.get_table_names())
 
-def upgrade() -> None:
     # 1) re_properties.ref_code (String(16)) e índice único por tenant
-    props_cols = _get_existing_columns("re_properties")
+    props_cols = {c["name"] for c in insp.get_columns("re_properties")}
     if "ref_code" not in props_cols:
         with op.batch_alter_table("re_properties", schema=None) as batch_op:
             batch_op.add_column(sa.Column("ref_code", sa.String(length=16), nullable=True))
     # Criar índice único (tenant_id, ref_code) se não existir
-    insp = sa.inspect(op.get_bind())
     existing_idxs = {ix.get("name") for ix in insp.get_indexes("re_properties")}
     if "uix_re_prop_tenant_refcode" not in existing_idxs:
         op.create_index("uix_re_prop_tenant_refcode", "re_properties", ["tenant_id", "ref_code"], unique=True)
 
     # 2) Tabela re_property_external_refs
-    bind = op.get_bind()
-    has_ext_refs = False
-    try:
-        bind.exec_driver_sql("SELECT 1 FROM re_property_external_refs LIMIT 1")
-        has_ext_refs = True
-    except Exception:
-        has_ext_refs = False
-    if not has_ext_refs:
+    if "re_property_external_refs" not in existing_tables:
         op.create_table(
             "re_property_external_refs",
             sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
-            sa.Column("tenant_id", sa.Integer(), nullable=False, index=True),
-            sa.Column("provider", sa.String(length=32), nullable=False, index=True),
+            sa.Column("tenant_id", sa.Integer(), nullable=False),
+            sa.Column("provider", sa.String(length=32), nullable=False),
             sa.Column("external_id", sa.String(length=160), nullable=False),
             sa.Column("url", sa.String(length=500), nullable=True),
-            sa.Column("property_id", sa.Integer(), sa.ForeignKey("re_properties.id"), nullable=False, index=True),
+            sa.Column("property_id", sa.Integer(), sa.ForeignKey("re_properties.id"), nullable=False),
             sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
         )
         op.create_index(
@@ -64,9 +51,16 @@ def upgrade() -> None:
             ["tenant_id", "provider", "external_id"],
             unique=True,
         )
+        op.create_index(
+            "idx_re_prop_extref_tenant_property",
+            "re_property_external_refs",
+            ["tenant_id", "property_id"],
+            unique=False,
+        )
 
     # 3) re_leads: campos de campanha
-    leads_cols = _get_existing_columns("re_leads")
+    leads_cols = {c["name"] for c in insp.get_columns("re_leads")}
+    existing_lead_idxs = {ix.get("name") for ix in insp.get_indexes("re_leads")}
     with op.batch_alter_table("re_leads", schema=None) as batch_op:
         if "campaign_source" not in leads_cols:
             batch_op.add_column(sa.Column("campaign_source", sa.String(length=32), nullable=True))
@@ -80,8 +74,6 @@ def upgrade() -> None:
             batch_op.add_column(sa.Column("landing_url", sa.String(length=500), nullable=True))
         if "external_property_id" not in leads_cols:
             batch_op.add_column(sa.Column("external_property_id", sa.String(length=160), nullable=True))
-    insp = sa.inspect(op.get_bind())
-    existing_lead_idxs = {ix.get("name") for ix in insp.get_indexes("re_leads")}
     if "idx_re_leads_campaign_source" not in existing_lead_idxs:
         op.create_index("idx_re_leads_campaign_source", "re_leads", ["campaign_source"], unique=False)
     if "idx_re_leads_tenant_campaign_source" not in existing_lead_idxs:
@@ -107,6 +99,10 @@ def downgrade() -> None:
                 pass
 
     # 2) Dropar re_property_external_refs
+    try:
+        op.drop_index("idx_re_prop_extref_tenant_property", table_name="re_property_external_refs")
+    except Exception:
+        pass
     try:
         op.drop_index("uix_re_prop_extref", table_name="re_property_external_refs")
     except Exception:
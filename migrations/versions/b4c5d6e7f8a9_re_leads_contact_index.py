@@ -0,0 +1,41 @@
+"""re_leads: índice da FK contact_id
+
+Revision ID: b4c5d6e7f8a9
+Revises: a3b4c5d6e7f8
+Create Date: 2026-01-14
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b4c5d6e7f8a9"
+down_revision: Union[str, Sequence[str], None] = "a3b4c5d6e7f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "idx_re_leads_contact"
+# Bancos criados pelo create_all já têm o índice do index=True do modelo.
+MODEL_INDEX_NAME = "ix_re_leads_contact_id"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_leads" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("re_leads")}
+    if INDEX_NAME not in existing and MODEL_INDEX_NAME not in existing:
+        op.create_index(INDEX_NAME, "re_leads", ["contact_id"], unique=False)
+
+
+def downgrade() -> None:
+    # a1e2b3c4d5e6 também cria este índice e o remove no próprio downgrade.
+    pass
@@ -0,0 +1,55 @@
+"""conversations: partial index for open conversations
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-01-13
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8c9d0e1f2a3"
+down_revision: Union[str, Sequence[str], None] = "a7b8c9d0e1f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "ix_conversations_open"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    # conversations é criada pelo create_all da aplicação.
+    # messages (tenant_id, idempotency_key) e contacts (tenant_id, wa_id) já têm índices únicos.
+    if "conversations" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("conversations")}
+    if INDEX_NAME not in existing:
+        op.create_index(
+            INDEX_NAME,
+            "conversations",
+            ["tenant_id", "contact_id"],
+            unique=False,
+            postgresql_where=sa.text("status != 'closed'"),
+            sqlite_where=sa.text("status != 'closed'"),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "conversations" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("conversations")}
+    if INDEX_NAME in existing:
+        op.drop_index(INDEX_NAME, table_name="conversations")
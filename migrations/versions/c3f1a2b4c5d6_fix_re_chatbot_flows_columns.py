@@ -19,10 +19,6 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
-def _has_column(insp: sa.Inspector, table: str, col: str) -> bool:
-    return any(c.get("name") == col for c in insp.get_columns(table))
-
-
 def _has_index(insp: sa.Inspector, table: str, index_name: str) -> bool:
     return any(i.get("name") == index_name for i in insp.get_indexes(table))
 
@@ -34,53 +30,59 @@ def upgrade() -> None:
     if "re_chatbot_flows" not in insp.get_table_names():
         return
 
+    # One reflection pass; each probe below is a set lookup
+    existing_cols = {c.get("name") for c in insp.get_columns("re_chatbot_flows")}
+
     # Columns expected by the SQLAlchemy model
-    if not _has_column(insp, "re_chatbot_flows", "domain"):
+    if "domain" not in existing_cols:
         op.add_column(
             "re_chatbot_flows",
             sa.Column("domain", sa.String(length=64), nullable=False, server_default="real_estate"),
         )
 
-    if not _has_column(insp, "re_chatbot_flows", "flow_definition"):
+    if "flow_definition" not in existing_cols:
         op.add_column("re_chatbot_flows", sa.Column("flow_definition", sa.JSON(), nullable=False, server_default=sa.text("'{}'::json")))
 
-    if not _has_column(insp, "re_chatbot_flows", "is_published"):
+    if "is_published" not in existing_cols:
         op.add_column(
             "re_chatbot_flows",
             sa.Column("is_published", sa.Boolean(), nullable=False, server_default=sa.text("false")),
         )
 
-    if not _has_column(insp, "re_chatbot_flows", "published_version"):
+    if "published_version" not in existing_cols:
         op.add_column(
             "re_chatbot_flows",
             sa.Column("published_version", sa.Integer(), nullable=False, server_default="0"),
         )
 
-    if not _has_column(insp, "re_chatbot_flows", "published_at"):
+    if "published_at" not in existing_cols:
         op.add_column("re_chatbot_flows", sa.Column("published_at", sa.DateTime(), nullable=True))
 
-    if not _has_column(insp, "re_chatbot_flows", "published_by"):
+    if "published_by" not in existing_cols:
         op.add_column("re_chatbot_flows", sa.Column("published_by", sa.String(length=180), nullable=True))
 
-    if not _has_column(insp, "re_chatbot_flows", "created_at"):
+    if "created_at" not in existing_cols:
         op.add_column(
             "re_chatbot_flows",
             sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
         )
 
-    if not _has_column(insp, "re_chatbot_flows", "updated_at"):
+    if "updated_at" not in existing_cols:
         op.add_column(
             "re_chatbot_flows",
             sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
         )
 
     # Index used by lookups for published flow
-    if not _has_index(insp, "re_chatbot_flows", "idx_re_chatbot_flow_tenant_domain_published"):
+    existing_idxs = {i.get("name") for i in insp.get_indexes("re_chatbot_flows")}
+    if "idx_re_chatbot_flow_published" not in existing_idxs:
         op.create_index(
-            "idx_re_chatbot_flow_tenant_domain_published",
+            "idx_re_chatbot_flow_published",
             "re_chatbot_flows",
-            ["tenant_id", "domain", "is_published"],
+            ["tenant_id", "domain"],
             unique=False,
+            postgresql_where=sa.text("is_published = true"),
+            sqlite_where=sa.text("is_published = 1"),
         )
 
 
@@ -91,7 +93,7 @@ def downgrade() -> None:
     if "re_chatbot_flows" not in insp.get_table_names():
         return
 
-    if _has_index(insp, "re_chatbot_flows", "idx_re_chatbot_flow_tenant_domain_published"):
-        op.drop_index("idx_re_chatbot_flow_tenant_domain_published", table_name="re_chatbot_flows")
+    if _has_index(insp, "re_chatbot_flows", "idx_re_chatbot_flow_published"):
+        op.drop_index("idx_re_chatbot_flow_published", table_name="re_chatbot_flows")
 
     # Downgrade is intentionally conservative: we avoid dropping columns to prevent data loss.
@@ -0,0 +1,47 @@
+"""re_chatbot_flows: índice parcial da listagem de flows ativos
+
+Revision ID: c5d6e7f8a9b0
+Revises: b4c5d6e7f8a9
+Create Date: 2026-01-14
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d6e7f8a9b0"
+down_revision: Union[str, Sequence[str], None] = "b4c5d6e7f8a9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "idx_re_chatbot_flows_active"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_chatbot_flows" not in insp.get_table_names():
+        return
+
+    # Bancos que já passaram por f1a2b3c4d5e8 antes de ela criar o índice.
+    existing = {ix.get("name") for ix in insp.get_indexes("re_chatbot_flows")}
+    if INDEX_NAME not in existing:
+        op.create_index(
+            INDEX_NAME,
+            "re_chatbot_flows",
+            ["tenant_id", sa.text("updated_at DESC"), sa.text("id DESC")],
+            unique=False,
+            postgresql_where=sa.text("is_archived = false"),
+            sqlite_where=sa.text("is_archived = 0"),
+        )
+
+
+def downgrade() -> None:
+    # f1a2b3c4d5e8 também cria este índice e o remove no próprio downgrade.
+    pass
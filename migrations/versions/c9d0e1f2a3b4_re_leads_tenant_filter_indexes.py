@@ -0,0 +1,81 @@
+"""re_leads: composite tenant filter indexes instead of single-column ones
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-01-14
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c9d0e1f2a3b4"
+down_revision: Union[str, Sequence[str], None] = "b8c9d0e1f2a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Índices de coluna única de baixa seletividade: criados por a1e2b3c4d5e6 (idx_*)
+# ou pelo create_all (ix_*). cidade/bairro são filtrados com ILIKE '%x%', que não usa índice.
+SINGLE_COLUMN_INDEXES = {
+    "idx_re_leads_city": ["cidade"],
+    "idx_re_leads_state": ["estado"],
+    "idx_re_leads_bairro": ["bairro"],
+    "idx_re_leads_dormitorios": ["dormitorios"],
+    "idx_re_leads_preco_min": ["preco_min"],
+    "idx_re_leads_preco_max": ["preco_max"],
+    "ix_re_leads_cidade": ["cidade"],
+    "ix_re_leads_estado": ["estado"],
+    "ix_re_leads_bairro": ["bairro"],
+    "ix_re_leads_dormitorios": ["dormitorios"],
+    "ix_re_leads_preco_min": ["preco_min"],
+    "ix_re_leads_preco_max": ["preco_max"],
+    "ix_re_leads_finalidade": ["finalidade"],
+    "ix_re_leads_tipo": ["tipo"],
+}
+
+COMPOSITE_INDEXES = {
+    "idx_re_leads_tenant_filters": ["tenant_id", "finalidade", "tipo", "dormitorios"],
+    "idx_re_leads_tenant_price": ["tenant_id", "preco_min", "preco_max"],
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_leads" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("re_leads")}
+
+    for name, cols in COMPOSITE_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "re_leads", cols, unique=False)
+
+    for name in SINGLE_COLUMN_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name="re_leads")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_leads" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("re_leads")}
+
+    # Restaura só os índices da migração a1e2b3c4d5e6 (os ix_* eram do create_all).
+    for name, cols in SINGLE_COLUMN_INDEXES.items():
+        if name.startswith("idx_") and name not in existing:
+            op.create_index(name, "re_leads", cols, unique=False)
+
+    for name in COMPOSITE_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name="re_leads")
@@ -0,0 +1,60 @@
+"""re_leads: covering (tenant_id, campaign_source, status, created_at) index
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-01-14
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d0e1f2a3b4c5"
+down_revision: Union[str, Sequence[str], None] = "c9d0e1f2a3b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "idx_re_leads_tenant_campaign_source"
+COVERING_COLS = ["tenant_id", "campaign_source", "status", "created_at"]
+# Dominados pelo composto que começa por tenant_id (b2c3d4e5f6a7 / create_all).
+SINGLE_COLUMN_INDEXES = ["idx_re_leads_campaign_source", "ix_re_leads_campaign_source"]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_leads" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name"): ix.get("column_names") for ix in insp.get_indexes("re_leads")}
+
+    if existing.get(INDEX_NAME) != COVERING_COLS:
+        if INDEX_NAME in existing:
+            op.drop_index(INDEX_NAME, table_name="re_leads")
+        op.create_index(INDEX_NAME, "re_leads", COVERING_COLS, unique=False)
+
+    for name in SINGLE_COLUMN_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name="re_leads")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_leads" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("re_leads")}
+
+    if INDEX_NAME in existing:
+        op.drop_index(INDEX_NAME, table_name="re_leads")
+    op.create_index(INDEX_NAME, "re_leads", ["tenant_id", "campaign_source"], unique=False)
+    if "idx_re_leads_campaign_source" not in existing:
+        op.create_index("idx_re_leads_campaign_source", "re_leads", ["campaign_source"], unique=False)
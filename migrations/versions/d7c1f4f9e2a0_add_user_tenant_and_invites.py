@@ -23,18 +23,20 @@ user_role_enum = postgresql.ENUM("admin", "collaborator", name="userrole", creat
 
 def upgrade() -> None:
     bind = op.get_bind()
+    # Toda a reflexão antes do primeiro DDL; o resto são consultas a sets em Python.
     insp = inspect(bind)
+    existing_tables = set(insp.get_table_names())
+    user_cols = {c["name"] for c in insp.get_columns("users")}
+    user_indexes = {ix["name"] for ix in insp.get_indexes("users")}
+    user_fks = {fk["name"] for fk in insp.get_foreign_keys("users") if fk.get("name")}
 
     # users.tenant_id
-    user_cols = {c["name"] for c in insp.get_columns("users")}
     if "tenant_id" not in user_cols:
         op.add_column("users", sa.Column("tenant_id", sa.Integer(), nullable=True))
 
-    user_indexes = {ix["name"] for ix in insp.get_indexes("users")}
     if "ix_users_tenant_id" not in user_indexes:
         op.create_index("ix_users_tenant_id", "users", ["tenant_id"], unique=False)
 
-    user_fks = {fk["name"] for fk in insp.get_foreign_keys("users") if fk.get("name")}
     if "fk_users_tenant" not in user_fks:
         op.create_foreign_key(
             "fk_users_tenant",
@@ -46,7 +48,7 @@ def upgrade() -> None:
         )
 
     # user_invites table
-    if not insp.has_table("user_invites"):
+    if "user_invites" not in existing_tables:
         op.create_table(
             "user_invites",
             sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
@@ -65,17 +67,19 @@ def upgrade() -> None:
 def downgrade() -> None:
     bind = op.get_bind()
     insp = inspect(bind)
-    if insp.has_table("user_invites"):
+    existing_tables = set(insp.get_table_names())
+    user_cols = {c["name"] for c in insp.get_columns("users")}
+    user_indexes = {ix["name"] for ix in insp.get_indexes("users")}
+    user_fks = {fk["name"] for fk in insp.get_foreign_keys("users") if fk.get("name")}
+
+    if "user_invites" in existing_tables:
         op.drop_table("user_invites")
 
-    user_fks = {fk["name"] for fk in insp.get_foreign_keys("users") if fk.get("name")}
     if "fk_users_tenant" in user_fks:
         op.drop_constraint("fk_users_tenant", "users", type_="foreignkey")
 
-    user_indexes = {ix["name"] for ix in insp.get_indexes("users")}
     if "ix_users_tenant_id" in user_indexes:
         op.drop_index("ix_users_tenant_id", table_name="users")
 
-    user_cols = {c["name"] for c in insp.get_columns("users")}
     if "tenant_id" in user_cols:
         op.drop_column("users", "tenant_id")
@@ -0,0 +1,60 @@
+"""re_property_external_refs: (tenant_id, property_id) no lugar dos índices de coluna única
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-01-14
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e1f2a3b4c5d6"
+down_revision: Union[str, Sequence[str], None] = "d0e1f2a3b4c5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = "re_property_external_refs"
+INDEX_NAME = "idx_re_prop_extref_tenant_property"
+# Gerados pelo index=True antigo (create_all / b2c3d4e5f6a7); toda consulta real filtra por tenant.
+SINGLE_COLUMN_INDEXES = {
+    "ix_re_property_external_refs_tenant_id": "tenant_id",
+    "ix_re_property_external_refs_provider": "provider",
+    "ix_re_property_external_refs_property_id": "property_id",
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    # A tabela só existe em bancos criados pelo create_all da aplicação (529d4d52fce0 a remove).
+    if TABLE not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes(TABLE)}
+    if INDEX_NAME not in existing:
+        op.create_index(INDEX_NAME, TABLE, ["tenant_id", "property_id"], unique=False)
+    for name in SINGLE_COLUMN_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name=TABLE)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if TABLE not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes(TABLE)}
+    for name, col in SINGLE_COLUMN_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, TABLE, [col], unique=False)
+    if INDEX_NAME in existing:
+        op.drop_index(INDEX_NAME, table_name=TABLE)
@@ -0,0 +1,53 @@
+"""user_invites: partial index for active invites
+
+Revision ID: e4b5c6d7f8a9
+Revises: f1a2b3c4d5e8
+Create Date: 2026-01-12
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b5c6d7f8a9"
+down_revision: Union[str, Sequence[str], None] = "f1a2b3c4d5e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "ix_user_invites_active"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "user_invites" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("user_invites")}
+    if INDEX_NAME not in existing:
+        op.create_index(
+            INDEX_NAME,
+            "user_invites",
+            ["tenant_id", "email"],
+            unique=False,
+            postgresql_where=sa.text("used_at IS NULL"),
+            sqlite_where=sa.text("used_at IS NULL"),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "user_invites" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("user_invites")}
+    if INDEX_NAME in existing:
+        op.drop_index(INDEX_NAME, table_name="user_invites")
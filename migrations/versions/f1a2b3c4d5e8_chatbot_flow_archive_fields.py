@@ -19,8 +19,7 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
-def _has_column(insp: sa.Inspector, table: str, col: str) -> bool:
-    return any(c.get("name") == col for c in insp.get_columns(table))
+ACTIVE_INDEX_NAME = "idx_re_chatbot_flows_active"
 
 
 def upgrade() -> None:
@@ -30,18 +29,31 @@ def upgrade() -> None:
     if "re_chatbot_flows" not in insp.get_table_names():
         return
 
-    if not _has_column(insp, "re_chatbot_flows", "is_archived"):
+    existing_cols = {c.get("name") for c in insp.get_columns("re_chatbot_flows")}
+    if "is_archived" not in existing_cols:
         op.add_column(
             "re_chatbot_flows",
             sa.Column("is_archived", sa.Boolean(), nullable=False, server_default=sa.text("false")),
         )
 
-    if not _has_column(insp, "re_chatbot_flows", "archived_at"):
+    if "archived_at" not in existing_cols:
         op.add_column(
             "re_chatbot_flows",
             sa.Column("archived_at", sa.DateTime(), nullable=True),
         )
 
+    # Listagem do admin: WHERE tenant_id AND NOT is_archived ORDER BY updated_at DESC, id DESC
+    existing_idxs = {i.get("name") for i in insp.get_indexes("re_chatbot_flows")}
+    if ACTIVE_INDEX_NAME not in existing_idxs:
+        op.create_index(
+            ACTIVE_INDEX_NAME,
+            "re_chatbot_flows",
+            ["tenant_id", sa.text("updated_at DESC"), sa.text("id DESC")],
+            unique=False,
+            postgresql_where=sa.text("is_archived = false"),
+            sqlite_where=sa.text("is_archived = 0"),
+        )
+
 
 def downgrade() -> None:
     bind = op.get_bind()
@@ -50,4 +62,8 @@ def downgrade() -> None:
     if "re_chatbot_flows" not in insp.get_table_names():
         return
 
+    existing_idxs = {i.get("name") for i in insp.get_indexes("re_chatbot_flows")}
+    if ACTIVE_INDEX_NAME in existing_idxs:
+        op.drop_index(ACTIVE_INDEX_NAME, table_name="re_chatbot_flows")
+
     # Downgrade conservador: evita drop em produção para não perder dados.
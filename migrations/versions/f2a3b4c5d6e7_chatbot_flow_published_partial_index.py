@@ -0,0 +1,64 @@
+"""re_chatbot_flows: índice parcial dos flows publicados
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-01-14
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f2a3b4c5d6e7"
+down_revision: Union[str, Sequence[str], None] = "e1f2a3b4c5d6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "idx_re_chatbot_flow_published"
+# Versão anterior: is_published como última coluna da chave, rascunhos inclusos.
+OLD_INDEX_NAME = "idx_re_chatbot_flow_tenant_domain_published"
+# Criado pelo index=True antigo da coluna (9c1d2e3f4a5b / create_all); o parcial o substitui.
+FLAG_INDEX_NAME = "ix_re_chatbot_flows_is_published"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_chatbot_flows" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("re_chatbot_flows")}
+    if INDEX_NAME not in existing:
+        op.create_index(
+            INDEX_NAME,
+            "re_chatbot_flows",
+            ["tenant_id", "domain"],
+            unique=False,
+            postgresql_where=sa.text("is_published = true"),
+            sqlite_where=sa.text("is_published = 1"),
+        )
+    for name in (OLD_INDEX_NAME, FLAG_INDEX_NAME):
+        if name in existing:
+            op.drop_index(name, table_name="re_chatbot_flows")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    if "re_chatbot_flows" not in insp.get_table_names():
+        return
+
+    existing = {ix.get("name") for ix in insp.get_indexes("re_chatbot_flows")}
+    if OLD_INDEX_NAME not in existing:
+        op.create_index(OLD_INDEX_NAME, "re_chatbot_flows", ["tenant_id", "domain", "is_published"], unique=False)
+    if FLAG_INDEX_NAME not in existing:
+        op.create_index(FLAG_INDEX_NAME, "re_chatbot_flows", ["is_published"], unique=False)
+    if INDEX_NAME in existing:
+        op.drop_index(INDEX_NAME, table_name="re_chatbot_flows")
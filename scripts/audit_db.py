@@ -2,36 +2,64 @@
 """Auditoria completa do banco de dados SQLite"""
 import sqlite3
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Caminho do banco (um nível acima da pasta scripts)
 db_path = Path(__file__).parent.parent / 'dev.db'
 
-conn = sqlite3.connect(str(db_path))
+db_uri = f"{db_path.resolve().as_uri()}?mode=ro"
+
+
+def connect_ro():
+    # Somente leitura: não cria dev.db vazio por engano nem disputa locks de escrita com a app
+    c = sqlite3.connect(db_uri, uri=True)
+    # Os COUNT(*) varrem todas as tabelas: mapear o arquivo evita um read() por página
+    c.execute("PRAGMA mmap_size=268435456")
+    return c
+
+
+def count_rows(table_name):
+    # Uma conexão por thread (objetos sqlite3 não são compartilhados entre threads)
+    c = connect_ro()
+    try:
+        quoted = table_name.replace('"', '""')
+        return table_name, c.execute(f'SELECT COUNT(*) FROM "{quoted}"').fetchone()[0]
+    finally:
+        c.close()
+
+
+conn = connect_ro()
 cursor = conn.cursor()
 
 print("=" * 60)
 print("📊 AUDITORIA DO BANCO DE DADOS")
 print("=" * 60)
 
-# Listar todas as tabelas
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
+# Listar todas as tabelas com o número de colunas (pragma_table_info como função de tabela)
+cursor.execute("""
+    SELECT m.name, COUNT(p.name)
+    FROM sqlite_master m JOIN pragma_table_info(m.name) p
+    WHERE m.type='table'
+    GROUP BY m.name
+    ORDER BY m.name
+""")
 tables = cursor.fetchall()
 
+# Contagens independentes por tabela: em paralelo (o sqlite3 solta o GIL durante a consulta)
+row_counts = {}
+if tables:
+    with ThreadPoolExecutor(max_workers=min(len(tables), os.cpu_count() or 1, 8)) as ex:
+        row_counts = dict(ex.map(count_rows, [name for name, _ in tables]))
+
 print(f"\n📋 Total de tabelas: {len(tables)}\n")
 
-for (table_name,) in tables:
-    # Contar registros
-    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-    count = cursor.fetchone()[0]
-    
-    # Pegar estrutura
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = cursor.fetchall()
+for table_name, column_count in tables:
+    count = row_counts[table_name]
     
     print(f"📦 {table_name}")
     print(f"   Registros: {count}")
-    print(f"   Colunas: {len(columns)}")
+    print(f"   Colunas: {column_count}")
     
     if count > 0:
         print(f"   ⚠️  TEM DADOS!")
@@ -43,19 +71,9 @@ print("=" * 60)
 print("🔍 ANÁLISE DE REDUNDÂNCIA")
 print("=" * 60)
 
-cursor.execute("""
-    SELECT name FROM sqlite_master 
-    WHERE type='table' 
-    AND name NOT LIKE 'sqlite_%'
-    ORDER BY name
-""")
-all_tables = [t[0] for t in cursor.fetchall()]
+all_tables = [name for name, _ in tables if not name.startswith('sqlite_')]
 
-empty_tables = []
-for table in all_tables:
-    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-    if cursor.fetchone()[0] == 0:
-        empty_tables.append(table)
+empty_tables = [t for t in all_tables if row_counts[t] == 0]
 
 if empty_tables:
     print(f"\n✅ Tabelas vazias (OK para dev): {len(empty_tables)}")
@@ -71,9 +89,7 @@ print("=" * 60)
 
 lead_tables = [t for t in all_tables if 'lead' in t.lower()]
 for table in lead_tables:
-    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-    count = cursor.fetchone()[0]
-    print(f"   {table}: {count} registros")
+    print(f"   {table}: {row_counts[table]} registros")
 
 # Verificar tabelas de imóveis
 print("\n" + "=" * 60)
@@ -82,9 +98,7 @@ print("=" * 60)
 
 property_tables = [t for t in all_tables if 'propert' in t.lower() or 'imovel' in t.lower()]
 for table in property_tables:
-    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-    count = cursor.fetchone()[0]
-    print(f"   {table}: {count} registros")
+    print(f"   {table}: {row_counts[table]} registros")
 
 conn.close()
 
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Backfill direto via sqlite3 (sem SQLAlchemy) para evitar locks."""
 import sqlite3
+import string
 import sys
 from pathlib import Path
 
@@ -10,33 +11,25 @@ DB_PATH = PROJECT_ROOT / "dev.db"
 conn = sqlite3.connect(str(DB_PATH), timeout=30.0)
 cursor = conn.cursor()
 
-# Buscar properties sem ref_code
-cursor.execute("""
-    SELECT id, external_id 
-    FROM re_properties 
-    WHERE ref_code IS NULL OR ref_code = ''
-""")
-rows = cursor.fetchall()
-
-print(f"Encontrados {len(rows)} registros sem ref_code")
-
-updates = []
-for prop_id, ext_id in rows:
-    if ext_id and ext_id.strip():
-        code = ext_id.strip().upper()
-        # Validar padrão básico
-        if len(code) >= 2 and len(code) <= 10:
-            updates.append((code, prop_id))
+# WAL + synchronous=NORMAL: o commit único do backfill não paga fsync completo
+cursor.execute("PRAGMA journal_mode=WAL")
+cursor.execute("PRAGMA synchronous=NORMAL")
 
-print(f"Atualizando {len(updates)} registros...")
-
-for code, prop_id in updates:
-    cursor.execute(
-        "UPDATE re_properties SET ref_code = ? WHERE id = ?",
-        (code, prop_id)
-    )
+cursor.execute("SELECT COUNT(*) FROM re_properties WHERE ref_code IS NULL OR ref_code = ''")
+print(f"Encontrados {cursor.fetchone()[0]} registros sem ref_code")
 
+# Validação (2 a 10 caracteres) e normalização feitas no próprio UPDATE: nada trafega para o Python
+cursor.execute("BEGIN")
+# trim(x, :ws): mesmo conjunto de espaços em branco do str.strip() (ASCII), não só ' '
+cursor.execute("""
+    UPDATE re_properties
+    SET ref_code = upper(trim(external_id, :ws))
+    WHERE (ref_code IS NULL OR ref_code = '')
+      AND external_id IS NOT NULL
+      AND length(trim(external_id, :ws)) BETWEEN 2 AND 10
+""", {"ws": string.whitespace})
+updated = cursor.rowcount
 conn.commit()
 conn.close()
 
-print(f"✅ Concluído: {len(updates)} ref_codes populados")
+print(f"✅ Concluído: {updated} ref_codes populados")
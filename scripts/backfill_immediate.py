@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Backfill imediato: BEGIN IMMEDIATE para forçar lock exclusivo."""
 import sqlite3
+import string
 import sys
 from pathlib import Path
 
@@ -10,35 +11,32 @@ DB_PATH = PROJECT_ROOT / "dev.db"
 conn = sqlite3.connect(str(DB_PATH), timeout=60.0, isolation_level=None)
 cursor = conn.cursor()
 
+# WAL + synchronous=NORMAL: o COMMIT do backfill não paga fsync completo
+cursor.execute("PRAGMA journal_mode=WAL")
+cursor.execute("PRAGMA synchronous=NORMAL")
+cursor.execute("PRAGMA temp_store=MEMORY")
+cursor.execute("PRAGMA cache_size=-65536")
+cursor.execute("PRAGMA mmap_size=268435456")
+
 # Forçar lock exclusivo imediato
 cursor.execute("BEGIN IMMEDIATE")
 
 try:
-    # Buscar properties sem ref_code
+    # Buscar properties sem ref_code com external_id válido (2 a 10 caracteres), já normalizado
+    # TRIM(x, :ws): mesmo conjunto de espaços em branco do str.strip() (ASCII), não só ' '
     cursor.execute("""
-        SELECT id, external_id 
-        FROM re_properties 
-        WHERE ref_code IS NULL OR ref_code = ''
-    """)
-    rows = cursor.fetchall()
-    
-    print(f"Encontrados {len(rows)} registros sem ref_code")
-    
-    updates = []
-    for prop_id, ext_id in rows:
-        if ext_id and ext_id.strip():
-            code = ext_id.strip().upper()
-            # Validar padrão básico
-            if len(code) >= 2 and len(code) <= 10:
-                updates.append((code, prop_id))
+        SELECT UPPER(TRIM(external_id, :ws)), id
+        FROM re_properties
+        WHERE (ref_code IS NULL OR ref_code = '')
+          AND external_id IS NOT NULL
+          AND LENGTH(TRIM(external_id, :ws)) BETWEEN 2 AND 10
+    """, {"ws": string.whitespace})
+    updates = cursor.fetchall()
     
     print(f"Atualizando {len(updates)} registros...")
     
-    for code, prop_id in updates:
-        cursor.execute(
-            "UPDATE re_properties SET ref_code = ? WHERE id = ?",
-            (code, prop_id)
-        )
+    # Um executemany em vez de um execute por linha (mesma transação IMMEDIATE)
+    cursor.executemany("UPDATE re_properties SET ref_code = ? WHERE id = ?", updates)
     
     cursor.execute("COMMIT")
     print(f"✅ Concluído: {len(updates)} ref_codes populados")
@@ -18,6 +18,7 @@ Opcional:
 from __future__ import annotations
 import argparse
 import re
+import string
 import sys
 from pathlib import Path
 from typing import Dict, List, Tuple
@@ -27,7 +28,7 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from sqlalchemy import select, update, and_, text
+from sqlalchemy import func, select, update, and_, text
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError
 import time
@@ -36,32 +37,32 @@ from app.repositories.db import SessionLocal
 from app.domain.realestate.models import Property, PropertyExternalRef
 
 
-CODE_RE = re.compile(r"^[A-Z]{1,3}\d{2,6}$")  # A1234, ND12345 etc.
-DIGITS_RE = re.compile(r"^\d{2,6}$")           # 2 a 6 dígitos
+# Um único padrão, tentado em ordem de prioridade (a alternância só passa ao ramo seguinte
+# se o anterior falhar na string toda):
+#   1) URLs usuais: /imovel/<CODE>  2) ref=<CODE>
+#   3) alfanumérico tipo A1234, ND12345  4) 2 a 6 dígitos
+CODE_PATTERN = re.compile(
+    r"\A(?:"
+    r".*?/imovel/([A-Z0-9]{2,10})"
+    r"|.*?ref[=:\-/]([A-Z0-9]{2,10})"
+    r"|([A-Z]{1,3}\d{2,6}|\d{2,6})\Z"
+    r")",
+    re.IGNORECASE | re.DOTALL,
+)
 
-# Extração a partir de URLs usuais: /imovel/<CODE>, ref=<CODE>
-URL_PATTERNS = [
-    re.compile(r"/imovel/([A-Z0-9]{2,10})", re.IGNORECASE),
-    re.compile(r"ref[=:\-/]([A-Z0-9]{2,10})", re.IGNORECASE),
-]
 
-
-def extract_code_from_text(text: str | None) -> str | None:
+def match_code(text: str | None) -> str | None:
+    """Código de referência em `text`, que já deve vir normalizado (ver `_normalized`)."""
     if not text:
         return None
-    t = (text or "").strip().upper()
-    # 1) Padrões de URL
-    for pat in URL_PATTERNS:
-        m = pat.search(t)
-        if m:
-            return m.group(1)
-    # 2) Padrão alfanumérico tipo A1234
-    if CODE_RE.match(t):
-        return t
-    # 3) Dígitos puros
-    if DIGITS_RE.match(t):
-        return t
-    return None
+    m = CODE_PATTERN.match(text)
+    return m.group(m.lastindex) if m else None
+
+
+def _normalized(col):
+    # UPPER(TRIM(...)) no banco: as strings já chegam canônicas ao Python. TRIM sem o
+    # segundo argumento só remove espaços; o conjunto explícito equivale ao str.strip() (ASCII).
+    return func.upper(func.trim(col, string.whitespace))
 
 
 def collect_candidates(db: Session, tenant_id: int | None = None) -> Tuple[List[Tuple[int, str]], Dict[str, int]]:
@@ -74,70 +75,71 @@ def collect_candidates(db: Session, tenant_id: int | None = None) -> Tuple[List[
     stats = {"from_external_id": 0, "from_external_ref_url": 0}
     updates: List[Tuple[int, str]] = []
 
-    # 1) Buscar propriedades com ref_code vazio/nulo
-    stmt = select(Property).where((Property.ref_code.is_(None)) | (Property.ref_code == ""))
+    # Uma única consulta: propriedades sem ref_code com suas refs externas (LEFT JOIN),
+    # ordenadas por propriedade para que as linhas de cada uma venham contíguas.
+    stmt = (
+        select(
+            Property.id,
+            _normalized(Property.external_id),
+            _normalized(PropertyExternalRef.url),
+            _normalized(PropertyExternalRef.external_id),
+        )
+        .outerjoin(PropertyExternalRef, PropertyExternalRef.property_id == Property.id)
+        .where((Property.ref_code.is_(None)) | (Property.ref_code == ""))
+        .order_by(Property.id, PropertyExternalRef.id)
+    )
     if tenant_id is not None:
         stmt = stmt.where(Property.tenant_id == tenant_id)
-    props = db.execute(stmt).scalars().all()
-
-    # 2) Mapear external refs por property_id
-    ref_map: Dict[int, List[str]] = {}
-    ref_stmt = select(PropertyExternalRef.property_id, PropertyExternalRef.url, PropertyExternalRef.external_id)
-    if tenant_id is not None:
-        ref_stmt = ref_stmt.where(PropertyExternalRef.tenant_id == tenant_id)
-    for pid, url, ext_id in db.execute(ref_stmt).all():
-        ref_map.setdefault(pid, []).append(url or ext_id or "")
 
-    for p in props:
-        # Tentar via external_id do próprio registro
-        code = extract_code_from_text(p.external_id)
-        if code:
-            updates.append((p.id, code))
-            stats["from_external_id"] += 1
+    current_pid = None
+    resolved = False
+    # Streaming em lotes: só as colunas necessárias, sem materializar o resultado inteiro
+    for pid, prop_ext_id, ref_url, ref_ext_id in db.execute(stmt.execution_options(yield_per=1000)):
+        if pid != current_pid:
+            current_pid = pid
+            # Tentar via external_id do próprio registro
+            code = match_code(prop_ext_id)
+            resolved = code is not None
+            if resolved:
+                updates.append((pid, code))
+                stats["from_external_id"] += 1
+        if resolved or (ref_url is None and ref_ext_id is None):
             continue
         # Tentar via referências externas (URL / ref)
-        for candidate in ref_map.get(p.id, []):
-            code = extract_code_from_text(candidate)
-            if code:
-                updates.append((p.id, code))
-                stats["from_external_ref_url"] += 1
-                break
+        code = match_code(ref_url or ref_ext_id or "")
+        if code:
+            updates.append((pid, code))
+            stats["from_external_ref_url"] += 1
+            resolved = True
 
-    # Remover duplicatas mantendo último pro mesmo id (caso raro)
-    seen = {}
-    dedup_updates: List[Tuple[int, str]] = []
-    for pid, code in updates:
-        seen[pid] = code
-    for pid, code in seen.items():
-        dedup_updates.append((pid, code))
+    return updates, stats
 
-    return dedup_updates, stats
 
+def apply_updates(db: Session, updates: List[Tuple[int, str]], chunk_size: int = 5000, retries: int = 5, backoff: float = 0.3) -> int:
+    """Aplica os ref_codes em lotes: um UPDATE executemany (por PK) e um commit por lote.
 
-def apply_updates(db: Session, updates: List[Tuple[int, str]], chunk_size: int = 50, retries: int = 5, backoff: float = 0.3) -> int:
+    No SQLite cada lote abre a transação com BEGIN IMMEDIATE (lock de escrita já no início,
+    sem upgrade de lock no meio do lote); em caso de lock o lote inteiro é refeito.
+    """
+    immediate = db.get_bind().dialect.name == "sqlite"
     total = 0
-    since_last_commit = 0
-    for pid, code in updates:
+    for start in range(0, len(updates), chunk_size):
+        chunk = [{"id": pid, "ref_code": code} for pid, code in updates[start : start + chunk_size]]
         attempt = 0
         while True:
             try:
-                db.execute(
-                    update(Property)
-                    .where(Property.id == pid)
-                    .values(ref_code=code)
-                )
-                total += 1
-                since_last_commit += 1
-                if since_last_commit >= chunk_size:
-                    db.commit()
-                    since_last_commit = 0
+                if immediate:
+                    db.execute(text("BEGIN IMMEDIATE"))
+                db.execute(update(Property), chunk)
+                db.commit()
                 break
             except OperationalError:
+                db.rollback()
                 attempt += 1
                 if attempt >= retries:
                     raise
                 time.sleep(backoff * attempt)
-    db.commit()
+        total += len(chunk)
     return total
 
 
@@ -149,10 +151,13 @@ def main() -> None:
     args = parser.parse_args()
 
     with SessionLocal() as db:  # type: ignore
-        try:
+        if db.get_bind().dialect.name == "sqlite":
             db.execute(text("PRAGMA busy_timeout=5000"))
-        except Exception:
-            pass
+            # WAL + synchronous=NORMAL: os commits por lote não pagam fsync completo
+            db.execute(text("PRAGMA journal_mode=WAL"))
+            db.execute(text("PRAGMA synchronous=NORMAL"))
+            db.execute(text("PRAGMA temp_store=MEMORY"))
+            db.execute(text("PRAGMA cache_size=-65536"))
         updates, stats = collect_candidates(db, tenant_id=args.tenant_id)
         print("=" * 60)
         print("Backfill ref_code – DRY RUN" if not args.apply else "Backfill ref_code – APPLY")
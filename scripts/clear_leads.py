@@ -2,24 +2,18 @@
 """Script para limpar todos os leads do banco SQLite"""
 import sqlite3
 
-# Conectar no banco
-conn = sqlite3.connect('dev.db')
+# Conectar no banco (autocommit: a transação é aberta explicitamente abaixo)
+conn = sqlite3.connect('dev.db', isolation_level=None)
 cursor = conn.cursor()
 
-# Ver quantos leads existem
-cursor.execute('SELECT COUNT(*) FROM re_leads')
-total = cursor.fetchone()[0]
-print(f'📊 Total de leads antes: {total}')
-
-# Deletar todos
+# Lock de escrita já no início; DELETE sem WHERE usa a truncate optimization do SQLite
+# (sem varrer/journalizar linha a linha) e o rowcount já traz o total removido.
+cursor.execute('BEGIN IMMEDIATE')
 cursor.execute('DELETE FROM re_leads')
-conn.commit()
+total = cursor.rowcount
+cursor.execute('COMMIT')
 
-# Confirmar
-cursor.execute('SELECT COUNT(*) FROM re_leads')
-remaining = cursor.fetchone()[0]
 print(f'✅ Leads deletados: {total}')
-print(f'📊 Total de leads depois: {remaining}')
 
 conn.close()
 print('\n🎉 Banco limpo com sucesso!')
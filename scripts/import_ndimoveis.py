@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import importlib.util
 import json
 import sys
-import time
 from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
 from typing import Iterable
 
@@ -17,31 +19,32 @@ if str(PROJECT_ROOT) not in sys.path:
 
 from app.repositories.db import SessionLocal
 from app.domain.realestate.sources import ndimoveis as nd
-from app.domain.realestate.importer import upsert_property
+from app.domain.realestate.importer import insert_images, load_existing_properties, upsert_property
 
 
 def _cache_path(tenant_id: int, finalidades: list[str]) -> Path:
     fin = "_".join(sorted(set(finalidades)))
-    return Path(__file__).resolve().parent / f".nd_seen_urls_tenant{int(tenant_id)}_{fin}.json"
+    return Path(__file__).resolve().parent / f".nd_seen_urls_tenant{int(tenant_id)}_{fin}.txt"
 
 
 def _load_seen(cache_file: Path) -> set[str]:
     try:
-        if not cache_file.exists():
-            return set()
-        data = json.loads(cache_file.read_text(encoding="utf-8"))
-        if isinstance(data, list):
-            return {str(x) for x in data if x}
+        if cache_file.exists():
+            return {line for line in cache_file.read_text(encoding="utf-8").splitlines() if line}
+        # Formato antigo: lista JSON ordenada em <mesmo nome>.json
+        legacy = cache_file.with_suffix(".json")
+        if legacy.exists():
+            data = json.loads(legacy.read_text(encoding="utf-8"))
+            if isinstance(data, list):
+                return {str(x) for x in data if x}
         return set()
     except Exception:
         return set()
 
 
 def _save_seen(cache_file: Path, seen: set[str]) -> None:
-    cache_file.write_text(
-        json.dumps(sorted(seen), ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    # Uma URL por linha: sem ordenar nem serializar JSON a cada execução
+    cache_file.write_text("\n".join(seen), encoding="utf-8")
 
 
 def _iter_detail_urls(finalidade: str, page_start: int, max_pages: int) -> Iterable[str]:
@@ -50,47 +53,82 @@ def _iter_detail_urls(finalidade: str, page_start: int, max_pages: int) -> Itera
             yield list_url
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--tenant-id", type=int, required=True)
-    parser.add_argument("--finalidade", choices=["venda", "locacao", "both"], default="both")
-    parser.add_argument("--page-start", type=int, default=1)
-    parser.add_argument("--max-pages", type=int, default=5)
-    parser.add_argument("--limit-properties", type=int, default=100)
-    parser.add_argument("--throttle-ms", type=int, default=250)
-    parser.add_argument("--exhaust", action="store_true")
-    parser.add_argument("--stop-after-empty-blocks", type=int, default=2)
-    parser.add_argument("--cache-seen", action="store_true")
-    parser.add_argument("--reset-cache", action="store_true")
-    parser.add_argument("--apply", action="store_true")
-    args = parser.parse_args()
+def _client(concurrency: int) -> httpx.AsyncClient:
+    """Cliente único (pool keep-alive) para listagens e detalhes; HTTP/2 se o pacote h2 estiver instalado."""
+    size = max(1, int(concurrency))
+    return httpx.AsyncClient(
+        timeout=25.0,
+        headers=nd.UA,
+        verify=False,
+        follow_redirects=True,
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+    )
 
-    finalidades: list[str]
-    if args.finalidade == "both":
-        finalidades = ["venda", "locacao"]
-    else:
-        finalidades = [args.finalidade]
 
-    discovered: list[str] = []
-    cache_file = _cache_path(int(args.tenant_id), finalidades)
-    seen: set[str] = set()
-    if args.cache_seen and not args.reset_cache:
-        seen = _load_seen(cache_file)
+async def _fetch_details(
+    client: httpx.AsyncClient, urls: list[str], throttle_ms: int, concurrency: int, pool: Executor
+) -> list[nd.PropertyDTO | httpx.Response | Exception]:
+    """Baixa as páginas de detalhe em paralelo (no máximo `concurrency` simultâneas).
 
-    list_stats: Counter[str] = Counter()
-    list_status: Counter[int] = Counter()
+    Cada worker mantém o throttle entre as suas requisições. O parse (CPU) de cada página 200
+    vai para `pool` assim que ela chega, em paralelo com os downloads restantes. O resultado
+    segue a ordem de `urls`: o DTO, a resposta (status != 200) ou a exceção.
+    """
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+    throttle = max(0, int(throttle_ms)) / 1000.0
+    loop = asyncio.get_running_loop()
+
+    async def one(url: str) -> nd.PropertyDTO | httpx.Response | Exception:
+        async with sem:
+            try:
+                r = await client.get(url)
+            except Exception as e:  # noqa: BLE001
+                return e
+            finally:
+                await asyncio.sleep(throttle)
+        if r.status_code != 200:
+            return r
+        try:
+            return await loop.run_in_executor(pool, nd.parse_detail, r.text, url)
+        except Exception as e:  # noqa: BLE001
+            return e
 
-    with httpx.Client(timeout=25.0, headers=nd.UA, verify=False, follow_redirects=True) as client:
+    return await asyncio.gather(*(one(u) for u in urls))
+
+
+async def _crawl(
+    args: argparse.Namespace,
+    finalidades: list[str],
+    seen: set[str],
+    discovered: list[str],
+    list_stats: Counter[str],
+    list_status: Counter[int],
+    pool: Executor,
+) -> list[nd.PropertyDTO | httpx.Response | Exception]:
+    """Descoberta (listagens, em sequência) e download dos detalhes sobre o mesmo pool de conexões."""
+    throttle = max(0, int(args.throttle_ms)) / 1000.0
+    async with _client(int(args.concurrency)) as client:
         empty_blocks = 0
         block_start = int(args.page_start)
+        # Posição (em list_url_candidates) do formato de URL que funcionou por finalidade:
+        # nas páginas seguintes ele é tentado primeiro, sem passar pelos demais candidatos.
+        winning_shape: dict[str, int] = {}
         while True:
             new_in_block = 0
             for fin in finalidades:
                 for page in range(block_start, block_start + int(args.max_pages)):
                     found_links: list[str] = []
-                    for list_url in nd.list_url_candidates(fin, page):
+                    candidates = nd.list_url_candidates(fin, page)
+                    order = list(range(len(candidates)))
+                    best = winning_shape.get(fin)
+                    if best is not None and best < len(candidates):
+                        order.remove(best)
+                        order.insert(0, best)
+                    for idx in order:
+                        list_url = candidates[idx]
                         try:
-                            r = client.get(list_url)
+                            r = await client.get(list_url)
                             list_status[int(r.status_code)] += 1
                             if r.status_code != 200:
                                 continue
@@ -99,11 +137,12 @@ def main() -> None:
                                 list_stats[f"{fin}_pages_with_links"] += 1
                                 list_stats[f"{fin}_links_total"] += len(links)
                                 found_links = links
+                                winning_shape[fin] = idx
                                 break
                         except Exception:
                             list_stats[f"{fin}_errors"] += 1
                         finally:
-                            time.sleep(max(0, int(args.throttle_ms)) / 1000.0)
+                            await asyncio.sleep(throttle)
 
                     for url in found_links:
                         if url in seen:
@@ -132,6 +171,46 @@ def main() -> None:
                 break
             block_start += int(args.max_pages)
 
+        # Detalhes em paralelo, reaproveitando as conexões abertas na descoberta
+        return await _fetch_details(client, discovered, int(args.throttle_ms), int(args.concurrency), pool)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenant-id", type=int, required=True)
+    parser.add_argument("--finalidade", choices=["venda", "locacao", "both"], default="both")
+    parser.add_argument("--page-start", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=5)
+    parser.add_argument("--limit-properties", type=int, default=100)
+    parser.add_argument("--throttle-ms", type=int, default=250)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--parse-workers", type=int, default=None, help="Processos de parse (padrão: nº de CPUs)")
+    parser.add_argument("--exhaust", action="store_true")
+    parser.add_argument("--stop-after-empty-blocks", type=int, default=2)
+    parser.add_argument("--cache-seen", action="store_true")
+    parser.add_argument("--reset-cache", action="store_true")
+    parser.add_argument("--apply", action="store_true")
+    args = parser.parse_args()
+
+    finalidades: list[str]
+    if args.finalidade == "both":
+        finalidades = ["venda", "locacao"]
+    else:
+        finalidades = [args.finalidade]
+
+    discovered: list[str] = []
+    cache_file = _cache_path(int(args.tenant_id), finalidades)
+    seen: set[str] = set()
+    if args.cache_seen and not args.reset_cache:
+        seen = _load_seen(cache_file)
+
+    list_stats: Counter[str] = Counter()
+    list_status: Counter[int] = Counter()
+
+    # Rede e parse (processos) sobrepostos; upsert depois, em sequência, numa única sessão/transação
+    with ProcessPoolExecutor(max_workers=args.parse_workers) as pool:
+        results = asyncio.run(_crawl(args, finalidades, seen, discovered, list_stats, list_status, pool))
+
     processed = 0
     created = 0
     updated = 0
@@ -139,33 +218,39 @@ def main() -> None:
     errors: list[dict] = []
     type_counts: Counter[str] = Counter()
 
-    with httpx.Client(timeout=25.0, headers=nd.UA, verify=False, follow_redirects=True) as client:
+    parsed: list[tuple[str, nd.PropertyDTO]] = []
+    for url, dto in zip(discovered, results):
+        if isinstance(dto, Exception):
+            errors.append({"url": url, "error": str(dto)})
+            continue
+        if isinstance(dto, httpx.Response):
+            errors.append({"url": url, "status": dto.status_code})
+            continue
+        if dto.ptype:
+            type_counts[str(dto.ptype)] += 1
+        processed += 1
+        parsed.append((url, dto))
+
+    if args.apply and parsed:
         with SessionLocal() as db:
-            for url in discovered:
+            # Um SELECT ... IN para todos os imóveis já existentes, em vez de um por DTO
+            existing = load_existing_properties(db, int(args.tenant_id), (dto for _, dto in parsed))
+            # Imagens de todos os imóveis vão num único INSERT executemany ao final
+            pending_images: dict[int, list[dict]] = {}
+            for url, dto in parsed:
                 try:
-                    r = client.get(url)
-                    if r.status_code != 200:
-                        errors.append({"url": url, "status": r.status_code})
-                        continue
-                    dto = nd.parse_detail(r.text, url)
-                    if dto.ptype:
-                        type_counts[str(dto.ptype)] += 1
-                    processed += 1
-
-                    if args.apply:
-                        st, imgs = upsert_property(db, int(args.tenant_id), dto)
-                        if st == "created":
-                            created += 1
-                        else:
-                            updated += 1
-                        images_created += int(imgs)
+                    st, imgs = upsert_property(
+                        db, int(args.tenant_id), dto, existing=existing, pending_images=pending_images
+                    )
+                    if st == "created":
+                        created += 1
+                    else:
+                        updated += 1
+                    images_created += int(imgs)
                 except Exception as e:  # noqa: BLE001
                     errors.append({"url": url, "error": str(e)})
-                finally:
-                    time.sleep(max(0, int(args.throttle_ms)) / 1000.0)
-
-            if args.apply:
-                db.commit()
+            insert_images(db, pending_images)
+            db.commit()
 
     if args.cache_seen:
         _save_seen(cache_file, seen)
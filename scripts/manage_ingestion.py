@@ -9,7 +9,7 @@ import httpx
 # Add project root to path to allow imports from 'app'
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.repositories.db import db_session
+from app.repositories.db import db_session, dialect_insert
 from app.repositories.models import Tenant
 
 
@@ -20,6 +20,21 @@ def ensure_test_tenant():
         tenant_id = 101
         tenant_name = "Loja de Veículos Teste"
 
+        insert_fn = dialect_insert(db)
+        if insert_fn is not None:
+            # Um único INSERT ... ON CONFLICT DO NOTHING (id ou nome já existentes)
+            result = db.execute(
+                insert_fn(Tenant)
+                .values(id=tenant_id, name=tenant_name, is_active=True)
+                .on_conflict_do_nothing()
+            )
+            db.commit()
+            if result.rowcount == 0:
+                print(f"Tenant {tenant_id} or name '{tenant_name}' already exists.")
+                return
+            print(f"Tenant {tenant_id} ('{tenant_name}') created successfully.")
+            return
+
         existing_by_id = db.get(Tenant, tenant_id)
         if existing_by_id:
             print(f"Tenant {tenant_id} already exists.")
@@ -2,7 +2,7 @@
 import re
 from app.repositories.db import SessionLocal
 from app.domain.realestate import models as re_models
-from sqlalchemy import select
+from sqlalchemy import and_, delete, func, or_, select
 from urllib.parse import urlparse
 
 
@@ -20,6 +20,23 @@ def is_valid_image_url(url: str | None) -> bool:
         return False
 
 
+DELETE_CHUNK = 900
+
+# Lado "certamente válido" de is_valid_image_url, para o pré-filtro SQL: http(s), authority
+# só com caracteres ASCII de host (sem '@', colchetes ou espaços), hostname com ponto e porta
+# opcional. Qualquer outra URL vai para a checagem Python, então o SQL nunca descarta uma
+# linha que is_valid_image_url rejeitaria.
+_HOST_CHARS = r"[A-Za-z0-9._~%!$&'()*+,;=-]"
+VALID_URL_SQL_RE = rf"^https?://{_HOST_CHARS}*\.{_HOST_CHARS}*(:[0-9]*)?([/?#]|$)"
+PROPERTY_CDN = 'cdn-imobibrasil.com.br/imagens/imoveis/'
+
+# Padrões de imagens de layout, numa única alternância compilada uma vez
+LAYOUT_RE = re.compile(
+    r"logo|icon|banner|site_modelo|imagensct|redesp_|whatsapp_modulo|dcorretor|imobibrasil"
+    r"|facebook|instagram|youtube|twitter|diversos"
+)
+
+
 def is_layout_image(url: str | None) -> bool:
     """Verifica se a imagem é de layout/site (não do imóvel)."""
     if not url:
@@ -27,36 +44,57 @@ def is_layout_image(url: str | None) -> bool:
     u = str(url).lower()
     
     # Se for do CDN de imóveis, NÃO é layout
-    if 'cdn-imobibrasil.com.br/imagens/imoveis/' in u:
+    if PROPERTY_CDN in u:
         return False
     
-    # Padrões de imagens de layout
-    layout_patterns = [
-        r'logo', r'icon', r'banner', r'site_modelo', r'imagensct',
-        r'redesp_', r'whatsapp_modulo', r'dcorretor', r'imobibrasil',
-        r'facebook', r'instagram', r'youtube', r'twitter', r'diversos'
-    ]
-    return any(re.search(pattern, u) for pattern in layout_patterns)
+    return LAYOUT_RE.search(u) is not None
+
+
+def classify_images(db) -> tuple[int, list, list]:
+    """Retorna (total, inválidas, de layout) com linhas (id, url, property_id).
+
+    O filtro no banco só deixa sair candidatas a remoção (regexp_match vira REGEXP no
+    SQLite e ~ no PostgreSQL); cada candidata é confirmada pelos predicados Python.
+    """
+    PropertyImage = re_models.PropertyImage
+    url = PropertyImage.url
+    total = db.scalar(select(func.count()).select_from(PropertyImage))
+
+    stmt = (
+        select(PropertyImage.id, url, PropertyImage.property_id)
+        .where(
+            or_(
+                url.is_(None),
+                ~func.trim(url).regexp_match(VALID_URL_SQL_RE),
+                and_(
+                    ~func.lower(url).contains(PROPERTY_CDN),
+                    # (?i) embutido: o REGEXP do SQLite ignora o argumento flags
+                    url.regexp_match("(?i)" + LAYOUT_RE.pattern),
+                ),
+            )
+        )
+        .execution_options(yield_per=5000)
+    )
+
+    invalid_images, layout_images = [], []
+    for img in db.execute(stmt):
+        if not is_valid_image_url(img.url):
+            invalid_images.append(img)
+        elif is_layout_image(img.url):
+            layout_images.append(img)
+    return total, invalid_images, layout_images
 
 
 def main():
     with SessionLocal() as db:
-        # Buscar todas as imagens
-        stmt = select(re_models.PropertyImage)
-        images = db.execute(stmt).scalars().all()
-        
-        print(f"Total de imagens no banco: {len(images)}")
+        PropertyImage = re_models.PropertyImage
+        total, invalid_images, layout_images = classify_images(db)
+        valid_count = total - len(invalid_images) - len(layout_images)
         
-        # Classificar imagens
-        invalid_images = [img for img in images if not is_valid_image_url(img.url)]
-        layout_images = [img for img in images if is_valid_image_url(img.url) and is_layout_image(img.url)]
-        valid_property_images = [
-            img for img in images 
-            if is_valid_image_url(img.url) and not is_layout_image(img.url)
-        ]
+        print(f"Total de imagens no banco: {total}")
         
         print(f"\n📊 Classificação:")
-        print(f"  ✓ Imagens válidas de imóveis: {len(valid_property_images)}")
+        print(f"  ✓ Imagens válidas de imóveis: {valid_count}")
         print(f"  ⚠️  Imagens de layout/site: {len(layout_images)}")
         print(f"  ❌ Imagens com URL inválida: {len(invalid_images)}")
         
@@ -77,8 +115,10 @@ def main():
             
             resposta = input("\nDeseja remover estas imagens? (s/n): ")
             if resposta.lower() == 's':
-                for img in to_remove:
-                    db.delete(img)
+                # DELETE ... WHERE id IN (...) em lotes (limite de variáveis do SQLite)
+                ids = [img.id for img in to_remove]
+                for start in range(0, len(ids), DELETE_CHUNK):
+                    db.execute(delete(PropertyImage).where(PropertyImage.id.in_(ids[start : start + DELETE_CHUNK])))
                 db.commit()
                 print(f"\n✓ {len(to_remove)} imagens removidas!")
                 print(f"  - {len(invalid_images)} inválidas")
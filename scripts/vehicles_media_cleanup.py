@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import argparse
 import re
+import string
 import sys
-from collections import Counter, defaultdict
 from pathlib import Path
 
+from sqlalchemy import func, select, update
+
 # Garantir que o diretório raiz do projeto esteja no sys.path
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
@@ -23,35 +25,41 @@ def build_parser() -> argparse.ArgumentParser:
     return p
 
 
+DELETE_CHUNK = 900
+STREAM_BATCH = 1000
+
+# Padrões de layout numa única alternância, compilada uma vez no import
+_LAYOUT_RE = re.compile(
+    r"logo|favicon|sprite|icon|brand|banner|header|footer|navbar|menu|social"
+    r"|whatsapp|facebook|instagram|tiktok|placeholder|noimage|default"
+)
+
+
 def _is_layout_like(url: str | None) -> bool:
-    if not url:
-        return True
-    u = str(url).strip().lower()
-    if u.startswith("data:"):
-        return True
-    if u.endswith(".svg") or u.endswith(".ico"):
+    u = str(url or "").strip().lower()
+    # Saídas baratas (métodos de str) antes de qualquer regex
+    if not u or u.startswith("data:") or u.endswith((".svg", ".ico")):
         return True
-    patterns = [
-        r"logo",
-        r"favicon",
-        r"sprite",
-        r"icon",
-        r"brand",
-        r"banner",
-        r"header",
-        r"footer",
-        r"navbar",
-        r"menu",
-        r"social",
-        r"whatsapp",
-        r"facebook",
-        r"instagram",
-        r"tiktok",
-        r"placeholder",
-        r"noimage",
-        r"default",
-    ]
-    return any(re.search(p, u) for p in patterns)
+    return _LAYOUT_RE.search(u) is not None
+
+
+def find_repeated_urls(db, tenant_id: int, threshold: int) -> set[str]:
+    """URLs (sem espaços nas pontas) que aparecem `threshold` vezes ou mais no tenant.
+
+    Agregado no banco (GROUP BY/HAVING): só as repetidas voltam. O trim usa o mesmo
+    conjunto de espaços em branco do str.strip() (ASCII) da classificação, não só ' '.
+    """
+    trimmed = func.trim(CatalogMedia.url, string.whitespace)
+    return {
+        u
+        for (u,) in db.execute(
+            select(trimmed)
+            .where(CatalogMedia.tenant_id == tenant_id)
+            .group_by(trimmed)
+            .having(func.count() >= threshold)
+        )
+        if u
+    }
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -59,20 +67,20 @@ def main(argv: list[str] | None = None) -> int:
     tenant_id = int(args.tenant_id)
 
     with SessionLocal() as db:
-        rows = (
-            db.query(CatalogMedia)
-            .filter(CatalogMedia.tenant_id == tenant_id)
+        repeated_urls = find_repeated_urls(db, tenant_id, int(args.repeat_threshold))
+
+        # Classificação em streaming (yield_per), só com as colunas usadas;
+        # em memória ficam apenas as linhas a remover.
+        rows = db.execute(
+            select(CatalogMedia.id, CatalogMedia.item_id, CatalogMedia.url)
+            .where(CatalogMedia.tenant_id == tenant_id)
             .order_by(CatalogMedia.item_id.asc(), CatalogMedia.sort_order.asc(), CatalogMedia.id.asc())
-            .all()
+            .execution_options(yield_per=STREAM_BATCH)
         )
-
-        print(f"Total media rows: {len(rows)}")
-
-        by_url = Counter([str(r.url).strip() for r in rows if r.url])
-        repeated_urls = {u for u, c in by_url.items() if c >= int(args.repeat_threshold)}
-
+        total = 0
         to_remove = []
         for r in rows:
+            total += 1
             u = str(r.url).strip() if r.url else ""
             if not u:
                 to_remove.append(r)
@@ -84,6 +92,7 @@ def main(argv: list[str] | None = None) -> int:
                 to_remove.append(r)
                 continue
 
+        print(f"Total media rows: {total}")
         print(f"Repeated URLs (>= {int(args.repeat_threshold)}): {len(repeated_urls)}")
         print(f"To remove: {len(to_remove)}")
 
@@ -98,30 +107,40 @@ def main(argv: list[str] | None = None) -> int:
                 print("Canceled.")
                 return 0
 
-        removed_ids = {int(r.id) for r in to_remove}
-        for r in to_remove:
-            db.delete(r)
+        # DELETE ... WHERE id IN (...) em lotes (limite de variáveis do SQLite)
+        removed_ids = sorted({int(r.id) for r in to_remove})
+        for start in range(0, len(removed_ids), DELETE_CHUNK):
+            (
+                db.query(CatalogMedia)
+                .filter(
+                    CatalogMedia.tenant_id == tenant_id,
+                    CatalogMedia.id.in_(removed_ids[start : start + DELETE_CHUNK]),
+                )
+                .delete(synchronize_session=False)
+            )
         db.commit()
 
-        # Reorder remaining media per item
-        remaining = (
-            db.query(CatalogMedia)
-            .filter(CatalogMedia.tenant_id == tenant_id)
+        # Reorder remaining media per item: as linhas chegam agrupadas por item (ORDER BY item_id),
+        # então basta um contador de posição, sem agrupar tudo em memória.
+        remaining = db.execute(
+            select(CatalogMedia.id, CatalogMedia.item_id, CatalogMedia.sort_order)
+            .where(CatalogMedia.tenant_id == tenant_id)
             .order_by(CatalogMedia.item_id.asc(), CatalogMedia.sort_order.asc(), CatalogMedia.id.asc())
-            .all()
+            .execution_options(yield_per=STREAM_BATCH)
         )
-        grouped: dict[int, list[CatalogMedia]] = defaultdict(list)
-        for r in remaining:
-            grouped[int(r.item_id)].append(r)
-
-        updated = 0
-        for item_id, medias in grouped.items():
-            for idx, m in enumerate(medias):
-                if int(m.sort_order) != int(idx):
-                    m.sort_order = int(idx)
-                    db.add(m)
-                    updated += 1
+        payload: list[dict] = []
+        current_item, idx = None, 0
+        for m in remaining:
+            if m.item_id != current_item:
+                current_item, idx = m.item_id, 0
+            if int(m.sort_order) != idx:
+                payload.append({"id": int(m.id), "sort_order": idx})
+            idx += 1
+        if payload:
+            # UPDATE executemany por PK, em vez de um UPDATE por linha no flush
+            db.execute(update(CatalogMedia), payload)
         db.commit()
+        updated = len(payload)
 
         print(f"Removed: {len(removed_ids)}")
         print(f"Reordered sort_order updates: {updated}")
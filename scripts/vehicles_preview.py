@@ -2,12 +2,18 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import importlib.util
 import json
 import sys
 from pathlib import Path
 
 import httpx
 
+try:  # orjson (extensão C) é opcional; sem ele, json da stdlib
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
 # Garantir que o diretório raiz do projeto esteja no sys.path
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
@@ -17,6 +23,12 @@ from app.domain.vehicles_ingestion.discovery import discover_site
 from app.domain.vehicles_ingestion.extractor import parse_vehicle_listing
 
 
+def _dumps(obj, pretty: bool = False) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode()
+    return json.dumps(obj, ensure_ascii=False, indent=2 if pretty else None)
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Vehicle scraping preview (dry-run). Does NOT write to DB.")
     p.add_argument("--base-url", type=str, required=True)
@@ -24,6 +36,7 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--max-detail-links", type=int, default=60)
     p.add_argument("--sample", type=int, default=10)
     p.add_argument("--timeout-seconds", type=float, default=15.0)
+    p.add_argument("--concurrency", type=int, default=8)
     p.add_argument("--pretty", action="store_true")
     return p
 
@@ -67,14 +80,22 @@ async def _amain(argv: list[str] | None = None) -> int:
     detail_urls = [str(u) for u in (res.detail_candidates or [])][: int(args.sample)]
     print(f"Discovered detail urls: {len(res.detail_candidates or [])} (showing {len(detail_urls)})")
 
-    out_rows: list[dict] = []
+    sem = asyncio.Semaphore(max(1, int(args.concurrency)))
 
-    async with httpx.AsyncClient(timeout=float(args.timeout_seconds), follow_redirects=True) as client:
-        for i, url in enumerate(detail_urls):
-            r = await client.get(url)
+    # Pool keep-alive do tamanho da concorrência; HTTP/2 se o pacote h2 estiver instalado
+    pool_size = max(1, int(args.concurrency))
+    async with httpx.AsyncClient(
+        timeout=float(args.timeout_seconds),
+        follow_redirects=True,
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+    ) as client:
+
+        async def fetch(i: int, url: str) -> dict:
+            async with sem:
+                r = await client.get(url)
             if r.status_code >= 400:
-                out_rows.append({"url": url, "error": f"http_{r.status_code}"})
-                continue
+                return {"url": url, "error": f"http_{r.status_code}"}
 
             listing = parse_vehicle_listing(html=r.text or "", page_url=url)
             attrs = {
@@ -97,12 +118,12 @@ async def _amain(argv: list[str] | None = None) -> int:
                 "images": listing.images,
             }
             row["quality"] = _quality_score(row)
-            out_rows.append(row)
+            return row
+
+        # Requisições em paralelo (no máximo `concurrency`); gather mantém a ordem de detail_urls
+        out_rows: list[dict] = list(await asyncio.gather(*(fetch(i, u) for i, u in enumerate(detail_urls))))
 
-    if args.pretty:
-        print(json.dumps(out_rows, ensure_ascii=False, indent=2))
-    else:
-        print(json.dumps(out_rows, ensure_ascii=False))
+    print(_dumps(out_rows, pretty=bool(args.pretty)))
 
     coverages = [float((r.get("quality") or {}).get("coverage") or 0.0) for r in out_rows if isinstance(r, dict)]
     if coverages:
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
 
 import httpx
@@ -15,6 +18,20 @@ from app.repositories.db import SessionLocal
 from app.domain.catalog.models import CatalogExternalReference, CatalogItem
 from app.domain.vehicles_ingestion.service import VehicleIngestionService
 
+# Limite de ids por SELECT ... IN (abaixo do teto de variáveis do SQLite)
+PREFETCH_CHUNK = 500
+
+
+@contextmanager
+def no_expire_on_commit(db):
+    """Commits no meio do lote sem expirar refs/itens/item_type já carregados (evita um SELECT por acesso)."""
+    prev = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        yield db
+    finally:
+        db.expire_on_commit = prev
+
 
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(
@@ -31,6 +48,7 @@ def build_parser() -> argparse.ArgumentParser:
         help="Only reprocess items missing key attributes (price/km/make/model).",
     )
     p.add_argument("--commit-every", type=int, default=10)
+    p.add_argument("--workers", type=int, default=8, help="Parallel HTTP fetches (DB stays on the main thread).")
     return p
 
 
@@ -54,6 +72,16 @@ def main(argv: list[str] | None = None) -> int:
 
         print(f"Found refs to reprocess: {len(refs)}")
 
+        # Itens de todas as refs via SELECT ... IN em lotes (em vez de um db.get por ref)
+        item_ids = sorted({int(r.item_id) for r in refs})
+        items_by_id: dict[int, CatalogItem] = {}
+        for start in range(0, len(item_ids), PREFETCH_CHUNK):
+            for it in db.query(CatalogItem).filter(
+                CatalogItem.tenant_id == tenant_id,
+                CatalogItem.id.in_(item_ids[start : start + PREFETCH_CHUNK]),
+            ):
+                items_by_id[int(it.id)] = it
+
         svc = VehicleIngestionService(db=db, tenant_id=tenant_id)
         item_type = svc._get_or_create_vehicle_type()  # internal reuse (avoid duplication)
 
@@ -73,20 +101,38 @@ def main(argv: list[str] | None = None) -> int:
                 return True
             return False
 
-        with httpx.Client(timeout=float(args.timeout_seconds), follow_redirects=True) as client:
-            for ref in refs:
-                url = str(ref.url or '').strip()
-                if not url:
-                    continue
+        # 1) Seleção (DB, sequencial): refs com URL, item existente e, se pedido, atributos faltando
+        todo: list[tuple[CatalogExternalReference, str]] = []
+        for ref in refs:
+            url = str(ref.url or '').strip()
+            if not url:
+                continue
+            it = items_by_id.get(int(ref.item_id))
+            if it is None:
+                continue
+            if only_missing and not is_missing(it):
+                continue
+            todo.append((ref, url))
+        processed = len(todo)
+
+        # 2) GETs em paralelo numa thread pool; parse e upsert seguem no thread principal (única sessão)
+        # Pool keep-alive do tamanho da thread pool; HTTP/2 se o pacote h2 estiver instalado
+        workers = max(1, int(args.workers))
+        with (
+            httpx.Client(
+                timeout=float(args.timeout_seconds),
+                follow_redirects=True,
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=httpx.Limits(max_connections=workers, max_keepalive_connections=workers),
+            ) as client,
+            ThreadPoolExecutor(max_workers=workers) as ex,
+            no_expire_on_commit(db),
+        ):
+            futures = {ex.submit(client.get, url): (ref, url) for ref, url in todo}
+            for fut in as_completed(futures):
+                ref, url = futures[fut]
                 try:
-                    it = db.get(CatalogItem, int(ref.item_id))
-                    if it is None:
-                        continue
-                    if only_missing and not is_missing(it):
-                        continue
-
-                    processed += 1
-                    r = client.get(url)
+                    r = fut.result()
                     if r.status_code >= 400:
                         raise RuntimeError(f"http_{r.status_code}")
 
@@ -1,8 +1,9 @@
+import contextlib
 import os
 import sys
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -24,26 +25,76 @@ from app.repositories.db import Base
 from app.repositories.models import Tenant
 
 
-@pytest.fixture(scope="function")
-def db_session():
-    """Cria uma sessão de banco de dados em memória para cada função de teste."""
+@pytest.fixture(autouse=True)
+def _clear_process_caches():
+    """Caches por processo (ex.: phone_number_id -> tenant) não podem vazar entre bancos de teste."""
+    from app.services import tenant_resolver
+
+    tenant_resolver._pnid_cache.clear()
+    yield
+    tenant_resolver._pnid_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """Banco em memória compartilhado pela sessão de testes: o schema é criado uma única vez."""
     engine = create_engine(
         "sqlite:///:memory:",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+
+    # pysqlite só abre transação antes de DML e não lida bem com SAVEPOINT;
+    # o BEGIN explícito deixa o rollback por teste (via savepoint) confiável.
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
     Base.metadata.create_all(bind=engine)
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(Tenant(id=1, name="tenant-1"))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def db_session(db_engine):
+    """Sessão por teste dentro de uma transação desfeita no teardown.
+
+    Os commits do código testado viram SAVEPOINTs (join_transaction_mode="create_savepoint").
+    """
+    connection = db_engine.connect()
+    trans = connection.begin()
+    TestingSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, bind=connection, join_transaction_mode="create_savepoint"
+    )
 
     db = TestingSessionLocal()
     try:
-        if db.get(Tenant, 1) is None:
-            db.add(Tenant(id=1, name="tenant-1"))
-            db.commit()
         yield db
     finally:
         db.close()
-        Base.metadata.drop_all(bind=engine)
+        trans.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def patch_db_session(db_session, monkeypatch):
+    """Devolve `patch(module)`: faz `module.db_session(...)` entregar a sessão do teste."""
+
+    @contextlib.contextmanager
+    def _session(*args, **kwargs):
+        yield db_session
+
+    def _patch(module) -> None:
+        monkeypatch.setattr(module, "db_session", _session)
+
+    return _patch
 
 
 @pytest.fixture(scope="function")
@@ -0,0 +1,43 @@
+import httpx
+
+from app.messaging import meta as meta_module
+from app.messaging.meta import MetaCloudProvider
+from app.repositories.models import WhatsAppAccount
+
+
+def _provider(patch_db_session) -> MetaCloudProvider:
+    patch_db_session(meta_module)
+    return MetaCloudProvider(api_base="https://graph.test/v19.0/", token="global-token", phone_number_id="111")
+
+
+def test_resolve_credentials_caches_tenant_account(db_session, patch_db_session):
+    db_session.add(WhatsAppAccount(tenant_id=1, phone_number_id="222", token="tenant-token", is_active=True))
+    db_session.commit()
+    provider = _provider(patch_db_session)
+
+    assert provider._resolve_credentials("1") == ("tenant-token", "222")
+    db_session.query(WhatsAppAccount).delete()
+    db_session.commit()
+    # Dentro do TTL a troca no banco ainda não é vista
+    assert provider._resolve_credentials("1") == ("tenant-token", "222")
+
+    provider._credentials_cache.clear()
+    assert provider._resolve_credentials("1") == ("global-token", "111")
+    assert provider._resolve_credentials(None) == ("global-token", "111")
+
+
+def test_post_with_retry_uses_given_token_without_mutating_provider(patch_db_session):
+    seen: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers["Authorization"])
+        return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+
+    provider = _provider(patch_db_session)
+    provider._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    provider._post_with_retry("https://graph.test/v19.0/222/messages", {}, token="tenant-token")
+    provider._post_with_retry("https://graph.test/v19.0/111/messages", {})
+
+    assert seen == ["Bearer tenant-token", "Bearer global-token"]
+    assert provider.token == "global-token"
@@ -0,0 +1,109 @@
+import logging
+from datetime import datetime
+
+from app.core.config import settings
+from app.core.logging import configure_logging, is_enabled_for
+from app.domain.realestate import models as re_models
+from app.repositories.models import Tenant
+from app.services import notification_service as notification_module
+from app.services.notification_service import NotificationService
+
+
+class _FakeProvider:
+    def __init__(self):
+        self.sent: list[tuple[str, str]] = []
+
+    def send_text(self, to, text, tenant_id=None):
+        self.sent.append((to, text))
+        return {"ok": True}
+
+    def send_template(self, to, template_name, language="pt_BR", components=None, tenant_id=None):
+        self.sent.append((to, template_name))
+        return {"ok": True}
+
+
+def _seed_visit(db, recipients: list) -> int:
+    tenant = db.get(Tenant, 1)
+    tenant.settings_json = {"booking_notification_recipients": recipients}
+    db.add(tenant)
+
+    prop = re_models.Property(
+        tenant_id=1,
+        title="Apartamento Centro",
+        type=re_models.PropertyType.apartment,
+        purpose=re_models.PropertyPurpose.rent,
+        price=2500.0,
+        address_city="Curitiba",
+        address_state="PR",
+        ref_code="A123",
+    )
+    lead = re_models.Lead(tenant_id=1, name="Maria", phone="5541999990000")
+    db.add_all([prop, lead])
+    db.flush()
+
+    visit = re_models.VisitSchedule(
+        tenant_id=1,
+        property_id=prop.id,
+        lead_id=lead.id,
+        scheduled_datetime=datetime(2025, 3, 10, 14, 30),
+    )
+    db.add(visit)
+    db.commit()
+    return int(visit.id)
+
+
+def test_notify_visit_requested_deduplicates_recipients(db_session, monkeypatch):
+    provider = _FakeProvider()
+    monkeypatch.setattr(notification_module, "get_provider", lambda: provider)
+    visit_id = _seed_visit(
+        db_session,
+        ["+5541988887777", "5541988887777@c.us", "5541988887777", "5541911112222", "  "],
+    )
+
+    out = NotificationService.notify_visit_requested(db_session, visit_id)
+
+    assert out == {"notified": 2, "errors": []}
+    assert [to for to, _ in provider.sent] == ["5541988887777", "5541911112222"]
+    text = provider.sent[0][1]
+    assert "Lead: Maria" in text
+    assert "Imóvel: #A123" in text
+    assert "Sugestão: 10/03/2025 14:30" in text
+
+
+def test_get_recipients_skips_blank_entries():
+    get = NotificationService._get_recipients
+    assert get({"booking_notification_recipients": ["5541", "", "   ", "5542"]}) == ["5541", "5542"]
+    assert get({"booking_notification_recipients": [5541, " ", "5542"]}) == ["5541", "5542"]
+    assert get({"booking_notification_recipients": "5541"}) == []
+    assert get({}) == []
+
+
+def test_normalize_wa_id_keeps_only_digits():
+    norm = NotificationService._normalize_wa_id
+    assert norm("+55 (41) 98888-7777") == "5541988887777"
+    assert norm("5541988887777@c.us") == "5541988887777"
+    assert norm("  ") == ""
+    assert norm("+５５41") == "５５41"
+
+
+def test_log_level_setting_skips_info_log_arguments(monkeypatch):
+    sliced: list = []
+
+    class _Message(str):
+        def __getitem__(self, key):
+            sliced.append(key)
+            return str.__getitem__(self, key)
+
+    monkeypatch.setattr(settings, "LOG_LEVEL", "warning")
+    configure_logging()
+    try:
+        assert not is_enabled_for(logging.INFO)
+        assert NotificationService.send_whatsapp("5541999990000", _Message("Olá")) is True
+        assert sliced == []
+    finally:
+        monkeypatch.undo()
+        configure_logging()
+
+    assert is_enabled_for(logging.INFO)
+    NotificationService.send_whatsapp("5541999990000", _Message("Olá"))
+    assert sliced == [slice(None, 50)]
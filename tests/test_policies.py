@@ -0,0 +1,19 @@
+from datetime import datetime, time
+
+from app.domain.policies import DEFAULT_TZ, next_business_open
+
+
+def test_next_business_open_returns_now_inside_hours():
+    now = datetime(2030, 3, 5, 15, 0, tzinfo=DEFAULT_TZ)
+    assert next_business_open(now) == now
+
+
+def test_next_business_open_before_opening_is_same_day():
+    now = datetime(2030, 3, 5, 6, 30, tzinfo=DEFAULT_TZ)
+    assert next_business_open(now) == datetime(2030, 3, 5, 9, 0, tzinfo=DEFAULT_TZ)
+
+
+def test_next_business_open_after_closing_is_next_day():
+    now = datetime(2030, 3, 5, 20, 0, tzinfo=DEFAULT_TZ)
+    opening = next_business_open(now, start=time(9, 0), end=time(18, 0))
+    assert opening == datetime(2030, 3, 6, 9, 0, tzinfo=DEFAULT_TZ)
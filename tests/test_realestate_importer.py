@@ -0,0 +1,65 @@
+from app.domain.realestate import models as re_models
+from app.domain.realestate.importer import insert_images, load_existing_properties, upsert_property
+from app.domain.realestate.sources.ndimoveis import PropertyDTO
+
+
+def _dto(external_id: str, images: list[str], price: float = 350000.0) -> PropertyDTO:
+    return PropertyDTO(
+        url=f"http://www.ndimoveis.com.br/imovel/{external_id}",
+        external_id=external_id,
+        title=f"Imóvel {external_id}",
+        description=None,
+        price=price,
+        purpose="sale",
+        ptype="house",
+        address=None,
+        city="Curitiba",
+        state="PR",
+        neighborhood=None,
+        bedrooms=3,
+        bathrooms=2,
+        suites=None,
+        parking=1,
+        area_total=None,
+        condo_fee=None,
+        iptu=None,
+        images=images,
+    )
+
+
+def test_upsert_with_prefetched_properties_creates_then_updates(db_session):
+    dtos = [_dto("ND1", ["http://img/1a.jpg", "", "http://img/1b.jpg"]), _dto("ND2", [])]
+
+    existing = load_existing_properties(db_session, 1, dtos)
+    assert existing == {}
+    results = [upsert_property(db_session, 1, d, existing=existing) for d in dtos]
+    db_session.commit()
+    assert results == [("created", 2), ("created", 0)]
+
+    dtos[0] = _dto("ND1", ["http://img/1c.jpg"], price=360000.0)
+    existing = load_existing_properties(db_session, 1, dtos)
+    assert sorted(existing) == ["ND1", "ND2"]
+    assert upsert_property(db_session, 1, dtos[0], existing=existing) == ("updated", 1)
+    db_session.commit()
+
+    prop = db_session.query(re_models.Property).filter_by(tenant_id=1, external_id="ND1").one()
+    assert prop.price == 360000.0
+    images = db_session.query(re_models.PropertyImage).filter_by(property_id=prop.id).all()
+    assert [(i.url, i.is_cover, i.sort_order) for i in images] == [("http://img/1c.jpg", True, 0)]
+    assert db_session.query(re_models.Property).count() == 2
+
+
+def test_upsert_with_pending_images_defers_insert(db_session):
+    pending: dict[int, list[dict]] = {}
+    existing = load_existing_properties(db_session, 1, [])
+    upsert_property(db_session, 1, _dto("ND3", ["http://img/3a.jpg"]), existing=existing, pending_images=pending)
+    # Mesmo imóvel repetido na importação: vale o último conjunto de imagens
+    dto = _dto("ND3", ["http://img/3b.jpg", "http://img/3c.jpg"])
+    upsert_property(db_session, 1, dto, existing=existing, pending_images=pending)
+    assert db_session.query(re_models.PropertyImage).count() == 0
+
+    assert insert_images(db_session, pending) == 2
+    db_session.commit()
+    assert pending == {}
+    urls = [i.url for i in db_session.query(re_models.PropertyImage).order_by(re_models.PropertyImage.sort_order)]
+    assert urls == ["http://img/3b.jpg", "http://img/3c.jpg"]
@@ -0,0 +1,60 @@
+from app.domain.realestate import models as re_models
+from scripts import repair_images
+
+
+URLS = [
+    "",
+    "   ",
+    "bad",
+    "ftp://a.b/c.jpg",
+    "HTTPS://a.b/c.jpg",
+    "http://localhost/x.jpg",
+    "http://a.b/foto.jpg",
+    " https://a.b/foto.jpg ",
+    "\thttps://a.b/foto.jpg\n",
+    "https://a.b",
+    "https://a.b:8080/x.jpg",
+    "https://a.b:x@host/x.jpg",
+    "https://a.b@host/x.jpg",
+    "https://user@a.b/x.jpg",
+    "https://[a.b/x.jpg",
+    "https://a./x.jpg",
+    "https://.b/x.jpg",
+    "https://a.b?x=1",
+    "https://a.b#frag",
+    "https://a.b/logo.png",
+    "https://a.b/BANNER.jpg",
+    "https://a.b/Facebook/1.jpg",
+    "https://cdn-imobibrasil.com.br/imagens/imoveis/logo1.jpg",
+    "https://CDN-IMOBIBRASIL.com.br/imagens/imoveis/icon.jpg",
+    "https://www.imobibrasil.com.br/site_modelo/x.jpg",
+]
+
+
+def test_sql_prefilter_matches_python_classification(db_session):
+    prop = re_models.Property(
+        tenant_id=1,
+        title="Casa",
+        type=re_models.PropertyType.house,
+        purpose=re_models.PropertyPurpose.sale,
+        price=1.0,
+        address_city="Curitiba",
+        address_state="PR",
+    )
+    db_session.add(prop)
+    db_session.flush()
+    for u in URLS:
+        db_session.add(re_models.PropertyImage(property_id=prop.id, url=u))
+    db_session.commit()
+
+    total, invalid, layout = repair_images.classify_images(db_session)
+
+    rows = db_session.query(re_models.PropertyImage).all()
+    expected_invalid = {r.id for r in rows if not repair_images.is_valid_image_url(r.url)}
+    expected_layout = {
+        r.id for r in rows if r.id not in expected_invalid and repair_images.is_layout_image(r.url)
+    }
+    assert total == len(URLS)
+    assert {r.id for r in invalid} == expected_invalid
+    assert {r.id for r in layout} == expected_layout
+    assert repair_images.is_valid_image_url("https://a.b@host/x.jpg") is False
@@ -0,0 +1,138 @@
+import pytest
+
+from app.repositories import models
+from app.workers import tasks_outbound
+
+
+class _FakeProvider:
+    def __init__(self):
+        self.calls: list[dict] = []
+
+    def send_text(self, to, text, tenant_id=None):
+        self.calls.append({"to": to, "text": text, "tenant_id": tenant_id})
+        return {"messages": [{"id": f"wamid.{len(self.calls)}"}]}
+
+    def send_template(self, to, template_name, language="pt_BR", components=None, tenant_id=None):
+        self.calls.append({"to": to, "template": template_name, "tenant_id": tenant_id})
+        return {"messages": [{"id": f"wamid.{len(self.calls)}"}]}
+
+
+@pytest.fixture
+def outbound(patch_db_session, monkeypatch):
+    provider = _FakeProvider()
+
+    patch_db_session(tasks_outbound)
+    monkeypatch.setattr(tasks_outbound, "within_business_hours", lambda: True)
+    monkeypatch.setattr(tasks_outbound, "get_provider", lambda: provider)
+    tasks_outbound._tenant_cache.clear()
+    yield provider
+    tasks_outbound._tenant_cache.clear()
+
+
+def test_send_text_records_and_marks_message_sent(outbound, db_session):
+    out = tasks_outbound.send_text.apply(
+        kwargs={"tenant_id": "1", "to_wa_id": "5541999990000", "text": "Olá", "idempotency_key": "k-1"}
+    ).get()
+
+    assert out["status"] == "sent"
+    assert outbound.calls == [{"to": "5541999990000", "text": "Olá", "tenant_id": "1"}]
+    msg = db_session.query(models.Message).one()
+    assert msg.status == "sent"
+    assert msg.payload["text"] == "Olá"
+    assert msg.payload["wa_response"]["messages"][0]["id"] == "wamid.1"
+
+
+def test_send_text_skips_duplicate_idempotency_key(outbound, db_session):
+    kwargs = {"tenant_id": "1", "to_wa_id": "5541999990000", "text": "Olá", "idempotency_key": "k-dup"}
+    assert tasks_outbound.send_text.apply(kwargs=kwargs).get()["status"] == "sent"
+    assert tasks_outbound.send_text.apply(kwargs=kwargs).get() == {"status": "duplicate"}
+
+    assert len(outbound.calls) == 1
+    assert db_session.query(models.Message).count() == 1
+    assert db_session.query(models.Contact).count() == 1
+    assert db_session.query(models.Conversation).count() == 1
+
+
+def test_send_template_reuses_contact_and_conversation(outbound, db_session):
+    for key in ("t-1", "t-2"):
+        out = tasks_outbound.send_template.apply(
+            kwargs={
+                "tenant_id": "1",
+                "to_wa_id": "5541999990000",
+                "template_name": "visita",
+                "idempotency_key": key,
+            }
+        ).get()
+        assert out["status"] == "sent"
+
+    assert db_session.query(models.Contact).count() == 1
+    assert db_session.query(models.Conversation).count() == 1
+    statuses = [m.status for m in db_session.query(models.Message).order_by(models.Message.id)]
+    assert statuses == ["sent", "sent"]
+
+
+def test_unknown_tenant_returns_error(outbound):
+    out = tasks_outbound.send_text.apply(kwargs={"tenant_id": "999", "to_wa_id": "5541", "text": "x"}).get()
+    assert out == {"status": "error", "error": "tenant_not_found"}
+    assert outbound.calls == []
+
+
+def test_send_text_opens_new_conversation_when_previous_is_closed(outbound, db_session):
+    contact = models.Contact(tenant_id=1, wa_id="5541999990000")
+    db_session.add(contact)
+    db_session.flush()
+    closed = models.Conversation(tenant_id=1, contact_id=contact.id, status=models.ConversationStatus.closed)
+    db_session.add(closed)
+    db_session.commit()
+
+    out = tasks_outbound.send_text.apply(
+        kwargs={"tenant_id": "1", "to_wa_id": "5541999990000", "text": "Oi", "idempotency_key": "k-closed"}
+    ).get()
+
+    assert out["status"] == "sent"
+    assert db_session.query(models.Contact).count() == 1
+    msg = db_session.query(models.Message).one()
+    assert msg.conversation_id != closed.id
+    assert db_session.get(models.Conversation, msg.conversation_id).contact_id == contact.id
+
+
+def test_mark_sent_targets_own_message_under_concurrency(outbound, db_session, monkeypatch):
+    # Simula outra task do mesmo tenant registrando uma mensagem durante o envio.
+    original_send = outbound.send_text
+
+    def _send_with_concurrent_queue(to, text, tenant_id=None):
+        other = models.Message(
+            tenant_id=1,
+            conversation_id=db_session.query(models.Conversation.id).scalar(),
+            direction=models.MessageDirection.outbound,
+            type="text",
+            payload={"text": "outra"},
+            status="queued",
+        )
+        db_session.add(other)
+        db_session.commit()
+        return original_send(to, text, tenant_id)
+
+    monkeypatch.setattr(outbound, "send_text", _send_with_concurrent_queue)
+    tasks_outbound.send_text.apply(
+        kwargs={"tenant_id": "1", "to_wa_id": "5541999990000", "text": "Olá", "idempotency_key": "k-own"}
+    ).get()
+
+    by_key = {m.idempotency_key: m.status for m in db_session.query(models.Message)}
+    assert by_key == {"k-own": "sent", None: "queued"}
+
+
+def test_send_text_off_hours_is_reenqueued_with_eta(outbound, db_session, monkeypatch):
+    deferred: list[dict] = []
+    monkeypatch.setattr(tasks_outbound, "within_business_hours", lambda: False)
+    monkeypatch.setattr(
+        tasks_outbound.send_text, "apply_async", lambda kwargs=None, eta=None, **kw: deferred.append({"kwargs": kwargs, "eta": eta})
+    )
+
+    out = tasks_outbound.send_text.run(tenant_id="1", to_wa_id="5541999990000", text="Olá", idempotency_key="k-late")
+
+    assert out == {"status": "scheduled"}
+    assert outbound.calls == []
+    assert deferred[0]["kwargs"]["idempotency_key"] == "k-late"
+    assert deferred[0]["eta"] is not None
+    assert db_session.query(models.Message).count() == 0
@@ -0,0 +1,29 @@
+import pytest
+
+from app.repositories.models import Tenant, WhatsAppAccount
+from app.services.tenant_resolver import TenantResolutionError, resolve_tenant_from_phone_number_id
+
+
+def test_resolve_tenant_caches_phone_number_mapping(db_session):
+    db_session.add(WhatsAppAccount(tenant_id=1, phone_number_id="pnid-1", is_active=True))
+    db_session.commit()
+
+    assert resolve_tenant_from_phone_number_id(db_session, " pnid-1 ").id == 1
+
+    # Mapeamento vem do cache; o Tenant ainda é lido e a suspensão vale na hora
+    db_session.query(WhatsAppAccount).delete()
+    db_session.get(Tenant, 1).is_active = False
+    db_session.commit()
+    with pytest.raises(TenantResolutionError) as exc:
+        resolve_tenant_from_phone_number_id(db_session, "pnid-1")
+    assert (exc.value.status_code, exc.value.detail) == (403, "tenant_suspended")
+
+
+def test_resolve_tenant_errors(db_session):
+    with pytest.raises(TenantResolutionError) as exc:
+        resolve_tenant_from_phone_number_id(db_session, "  ")
+    assert exc.value.status_code == 400
+
+    with pytest.raises(TenantResolutionError) as exc:
+        resolve_tenant_from_phone_number_id(db_session, "unknown")
+    assert (exc.value.status_code, exc.value.detail) == (404, "tenant_not_mapped_for_phone_number_id")
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.domain.catalog.models import CatalogIngestionRun
+from app.services import vehicle_ingestion_jobs
+
+
+def test_job_runner_is_reused_within_thread_and_closed_when_thread_ends():
+    runner = vehicle_ingestion_jobs._job_runner()
+    assert vehicle_ingestion_jobs._job_runner() is runner
+
+    other: list = []
+
+    def _worker():
+        r = vehicle_ingestion_jobs._job_runner()
+        r.run(asyncio.sleep(0))
+        other.append((r, r.get_loop()))
+
+    t = threading.Thread(target=_worker)
+    t.start()
+    t.join()
+    other_runner, other_loop = other[0]
+    assert other_runner is not runner
+    # Fim da thread: o runner dela é fechado junto com o event loop
+    assert other_loop.is_closed()
+
+
+def test_run_vehicle_ingestion_job_runs_service_on_shared_loop(db_session, monkeypatch, patch_db_session):
+    run = CatalogIngestionRun(tenant_id=1, source_base_url="https://example.com", status="queued")
+    db_session.add(run)
+    db_session.commit()
+    run_id = int(run.id)
+
+    patch_db_session(vehicle_ingestion_jobs)
+    loops: list = []
+
+    class _FakeService:
+        def __init__(self, db, tenant_id):
+            self.db = db
+
+        async def run(self, *, run_id, **kwargs):
+            loops.append(asyncio.get_running_loop())
+            r = self.db.get(CatalogIngestionRun, run_id)
+            r.status = "done"
+            self.db.commit()
+
+    monkeypatch.setattr(vehicle_ingestion_jobs, "VehicleIngestionService", _FakeService)
+    for _ in range(2):
+        vehicle_ingestion_jobs.run_vehicle_ingestion_job(
+            tenant_id=1,
+            run_id=run_id,
+            base_url="https://example.com",
+            max_listings=1,
+            timeout_seconds=1.0,
+            max_listing_pages=1,
+        )
+
+    assert len(loops) == 2 and loops[0] is loops[1]
+    db_session.expire_all()
+    assert db_session.get(CatalogIngestionRun, run_id).status == "done"
+
+
+def test_run_vehicle_ingestion_job_failure_persists_buffered_errors(db_session, monkeypatch, patch_db_session):
+    from app.domain.catalog.models import CatalogIngestionError
+    from app.domain.vehicles_ingestion.service import VehicleIngestionService
+
+    run = CatalogIngestionRun(tenant_id=1, source_base_url="https://example.com", status="queued")
+    db_session.add(run)
+    db_session.commit()
+    run_id = int(run.id)
+
+    class _FailingService(VehicleIngestionService):
+        async def run(self, *, run_id, **kwargs):
+            self._error_buffer.append(
+                {"tenant_id": 1, "run_id": run_id, "url": "https://example.com/v/1", "error": "http_500"}
+            )
+            raise RuntimeError("boom")
+
+    patch_db_session(vehicle_ingestion_jobs)
+    monkeypatch.setattr(vehicle_ingestion_jobs, "VehicleIngestionService", _FailingService)
+    vehicle_ingestion_jobs.run_vehicle_ingestion_job(
+        tenant_id=1,
+        run_id=run_id,
+        base_url="https://example.com",
+        max_listings=1,
+        timeout_seconds=1.0,
+        max_listing_pages=1,
+    )
+
+    db_session.expire_all()
+    assert db_session.get(CatalogIngestionRun, run_id).status == "error"
+    errors = sorted(e.error for e in db_session.query(CatalogIngestionError).filter_by(run_id=run_id))
+    assert errors == ["http_500", "run_job: boom"]
+
+
+def test_run_vehicle_ingestion_job_skips_finish_refresh_when_info_is_off(db_session, monkeypatch, patch_db_session):
+    run = CatalogIngestionRun(tenant_id=1, source_base_url="https://example.com", status="queued")
+    db_session.add(run)
+    db_session.commit()
+    run_id = int(run.id)
+
+    patch_db_session(vehicle_ingestion_jobs)
+    refreshed: list = []
+    monkeypatch.setattr(db_session, "refresh", lambda obj, *a, **k: refreshed.append(obj))
+
+    class _FakeService:
+        def __init__(self, db, tenant_id):
+            pass
+
+        async def run(self, **kwargs):
+            return None
+
+    monkeypatch.setattr(vehicle_ingestion_jobs, "VehicleIngestionService", _FakeService)
+    kwargs = dict(
+        tenant_id=1,
+        run_id=run_id,
+        base_url="https://example.com",
+        max_listings=1,
+        timeout_seconds=1.0,
+        max_listing_pages=1,
+    )
+
+    monkeypatch.setattr(settings, "LOG_LEVEL", "WARNING")
+    configure_logging()
+    try:
+        vehicle_ingestion_jobs.run_vehicle_ingestion_job(**kwargs)
+        assert refreshed == []
+    finally:
+        monkeypatch.setattr(settings, "LOG_LEVEL", "INFO")
+        configure_logging()
+
+    vehicle_ingestion_jobs.run_vehicle_ingestion_job(**kwargs)
+    assert len(refreshed) == 1
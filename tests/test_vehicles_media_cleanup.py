@@ -0,0 +1,22 @@
+from app.domain.catalog.models import CatalogItem, CatalogItemType, CatalogMedia
+from scripts import vehicles_media_cleanup
+
+
+def test_find_repeated_urls_groups_whitespace_padded_duplicates(db_session):
+    item_type = CatalogItemType(tenant_id=1, key="vehicle", name="Veículo")
+    db_session.add(item_type)
+    db_session.flush()
+    item = CatalogItem(tenant_id=1, item_type_id=item_type.id, title="Carro")
+    db_session.add(item)
+    db_session.flush()
+    urls = ["https://x/b.jpg\t"] * 3 + ["https://x/a.jpg\n"] * 2 + ["https://x/a.jpg", " https://x/c.jpg "]
+    for k, u in enumerate(urls):
+        db_session.add(CatalogMedia(tenant_id=1, item_id=item.id, url=u, sort_order=k))
+    db_session.commit()
+
+    repeated = vehicles_media_cleanup.find_repeated_urls(db_session, 1, 3)
+
+    assert repeated == {"https://x/b.jpg", "https://x/a.jpg"}
+    # As chaves batem com a normalização usada na classificação (str.strip())
+    assert {u.strip() for u in urls if u.strip() in repeated} == repeated
+    assert vehicles_media_cleanup.find_repeated_urls(db_session, 2, 1) == set()
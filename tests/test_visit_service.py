@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.domain.realestate import models as re_models
+from app.services.visit_service import VisitService
+
+
+def _today() -> datetime:
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def test_validate_phone_formats():
+    assert VisitService.validate_phone("(11) 96444-2592") == (True, "11964442592")
+    assert VisitService.validate_phone("+55 11 96444-2592") == (True, "11964442592")
+    assert VisitService.validate_phone("1133334444") == (True, "1133334444")
+    assert VisitService.validate_phone("12345") == (False, None)
+    assert VisitService.validate_phone("tel: (41) 98888–7777") == (True, "41988887777")
+
+
+def test_parse_date_input_shortcuts_and_explicit_dates():
+    today = _today()
+    assert VisitService.parse_date_input("hoje") == today
+    assert VisitService.parse_date_input("Amanhã de manhã") == today + timedelta(days=1)
+    assert VisitService.parse_date_input("depois de amanhã") == today + timedelta(days=2)
+    assert VisitService.parse_date_input("25/12/2030") == datetime(2030, 12, 25)
+    assert VisitService.parse_date_input("5-3-31") == datetime(2031, 3, 5)
+    assert VisitService.parse_date_input("31/02/2030") is None
+    # Dias da semana só casam como palavra inteira ("quando" contém "qua")
+    assert VisitService.parse_date_input("quando der") is None
+
+
+def test_parse_date_input_weekdays_point_to_next_occurrence():
+    today = _today()
+    for text, weekday in (("segunda", 0), ("terça-feira", 1), ("qua", 2), ("Sábado", 5), ("domingo", 6)):
+        parsed = VisitService.parse_date_input(text)
+        assert parsed is not None, text
+        assert parsed.weekday() == weekday
+        assert 1 <= (parsed - today).days <= 7
+
+
+def test_parse_time_input():
+    base = datetime(2030, 12, 25)
+    assert VisitService.parse_time_input("14h30", base) == datetime(2030, 12, 25, 14, 30)
+    assert VisitService.parse_time_input("9:05", base) == datetime(2030, 12, 25, 9, 5)
+    assert VisitService.parse_time_input("às 16h", base) == datetime(2030, 12, 25, 16, 0)
+    assert VisitService.parse_time_input("de manhã", base) == datetime(2030, 12, 25, 9, 0)
+    assert VisitService.parse_time_input("à tarde", base) == datetime(2030, 12, 25, 14, 0)
+    assert VisitService.parse_time_input("noite", base) == datetime(2030, 12, 25, 19, 0)
+    assert VisitService.parse_time_input("amanhã às 10h", base) == datetime(2030, 12, 25, 10, 0)
+    assert VisitService.parse_time_input("25h", base) is None
+    assert VisitService.parse_time_input("sem preferência", base) is None
+
+
+def _seed_lead_and_property(db) -> tuple[int, int]:
+    prop = re_models.Property(
+        tenant_id=1,
+        title="Casa Jardim",
+        type=re_models.PropertyType.house,
+        purpose=re_models.PropertyPurpose.sale,
+        price=450000.0,
+        address_city="Curitiba",
+        address_state="PR",
+    )
+    lead = re_models.Lead(tenant_id=1, name="João", phone="5541999990000")
+    db.add_all([prop, lead])
+    db.commit()
+    return int(lead.id), int(prop.id)
+
+
+def test_create_and_confirm_visit_update_lead_status(db_session):
+    lead_id, prop_id = _seed_lead_and_property(db_session)
+
+    visit_id = VisitService.create_visit(db_session, lead_id, prop_id, "41999990000", datetime(2030, 12, 25, 14, 0))
+    assert db_session.get(re_models.Lead, lead_id).status == re_models.LeadStatus.agendamento_pendente
+
+    visit = VisitService.confirm_visit(db_session, visit_id)
+    assert visit.status == "confirmed"
+    assert db_session.get(re_models.Lead, lead_id).status == re_models.LeadStatus.agendado
+
+    with pytest.raises(ValueError):
+        VisitService.cancel_visit(db_session, visit_id + 1000)